@@ -1,4 +1,5 @@
-from typing import Annotated
+from datetime import datetime
+from typing import Annotated, Literal
 
 from fastapi import Path, Query
 
@@ -49,4 +50,111 @@ INCLUDE_CURRENT_EVENT_ANNOTATION = Annotated[
         description="Include current events",
         example=False,
     ),
-]
\ No newline at end of file
+]
+
+
+FROM_ANNOTATION = Annotated[
+    datetime | None,
+    Query(
+        alias="from",
+        title="From",
+        description="Only events still running at this time",
+    ),
+]
+
+
+TO_ANNOTATION = Annotated[
+    datetime | None,
+    Query(
+        alias="to",
+        title="To",
+        description="Only events starting before this time",
+    ),
+]
+
+
+AGENDA_FROM_ANNOTATION = Annotated[
+    datetime | None,
+    Query(
+        alias="from",
+        title="From",
+        description="Only events starting at or after this time",
+    ),
+]
+
+
+AGENDA_TO_ANNOTATION = Annotated[
+    datetime | None,
+    Query(
+        alias="to",
+        title="To",
+        description="Only events starting before this time",
+    ),
+]
+
+
+LIMIT_ANNOTATION = Annotated[
+    int | None,
+    Query(
+        title="Limit",
+        description="Maximum number of items to return",
+        ge=1,
+        le=1000,
+    ),
+]
+
+
+BEFORE_CURSOR_ANNOTATION = Annotated[
+    str | None,
+    Query(
+        title="Before",
+        description="Cursor returned by the previous page to load older items",
+    ),
+]
+
+
+AFTER_CURSOR_ANNOTATION = Annotated[
+    str | None,
+    Query(
+        title="After",
+        description="Cursor returned by the previous page (X-Next-Cursor header)",
+    ),
+]
+
+
+SORT_ANNOTATION = Annotated[
+    str | None,
+    Query(
+        title="Sort",
+        description="Field to sort by, prefix with - for descending order",
+        examples=["-start_time"],
+    ),
+]
+
+
+FIELDS_ANNOTATION = Annotated[
+    str | None,
+    Query(
+        title="Fields",
+        description="Comma separated fields to return, all fields by default",
+        examples=["title,start_time"],
+    ),
+]
+
+
+STREAM_ANNOTATION = Annotated[
+    Literal["ndjson", "json"] | None,
+    Query(
+        title="Stream",
+        description="Stream the result as NDJSON or a chunked JSON array",
+    ),
+]
+
+
+ORDERED_ANNOTATION = Annotated[
+    bool,
+    Query(
+        title="Ordered",
+        description="Stop at the first failed item instead of writing the rest",
+    ),
+]
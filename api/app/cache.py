@@ -0,0 +1,531 @@
+"""Versioned read-through cache entries stored in Redis.
+
+Every entry is stored as ``<version>|<payload>`` next to a version key that
+writers increment. A read fetches both in one ``MGET`` and only counts as a
+hit when the versions match, so bumping the version invalidates every entry
+derived from it without having to find and delete them.
+
+Fills are written by a Lua script that re-checks the versions observed
+*before* the database read, so a fill racing with a write never stores data
+older than that write.
+
+Expired entries are kept for a while longer and served stale while one
+worker rebuilds them, and misses are coalesced per process and behind a
+Redis lock, so a popular entry expiring never sends every request to Mongo.
+
+Hot entries are also kept parsed in a small per-process LRU in front of
+Redis. Writers publish the keys they invalidate on ``INVALIDATION_CHANNEL``
+and every process evicts them; the short local TTL bounds staleness if a
+message is lost while the listener reconnects.
+"""
+
+import asyncio
+from collections import Counter, OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+import json
+import math
+import random
+import time
+from typing import Any
+import uuid
+from loguru import logger
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from app.config import settings
+from app.databases import clients
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# KEYS: entry, version keys..., tag sets...
+# ARGV: value, ttl, tag ttl, number of versions, expected versions..., tag member
+FILL_SCRIPT = """
+local versions = tonumber(ARGV[4])
+for i = 1, versions do
+    if (redis.call('GET', KEYS[i + 1]) or '0') ~= ARGV[i + 4] then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+for i = versions + 2, #KEYS do
+    redis.call('SADD', KEYS[i], ARGV[versions + 5])
+    redis.call('EXPIRE', KEYS[i], ARGV[3])
+end
+return 1
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class CacheStats:
+    """Hit and miss counters per cache name."""
+
+    def __init__(self) -> None:
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self.stale_hits: Counter[str] = Counter()
+
+    def hit(self, name: str) -> None:
+        self.hits[name] += 1
+
+    def miss(self, name: str) -> None:
+        self.misses[name] += 1
+
+    def stale(self, name: str) -> None:
+        self.stale_hits[name] += 1
+
+    def hit_ratio(self, name: str) -> float:
+        lookups = self.hits[name] + self.misses[name]
+        return self.hits[name] / lookups if lookups else 0.0
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        names = self.hits.keys() | self.misses.keys() | self.stale_hits.keys()
+        return {
+            name: {
+                "hits": self.hits[name],
+                "misses": self.misses[name],
+                "stale_hits": self.stale_hits[name],
+                "hit_ratio": self.hit_ratio(name),
+            }
+            for name in sorted(names)
+        }
+
+
+cache_stats = CacheStats()
+
+
+def jittered_ttl(ttl: int) -> int:
+    """Spread expiry of entries filled together so they do not all miss at once."""
+    jitter = settings.cache.ttl_jitter
+    return max(1, round(ttl * random.uniform(1 - jitter, 1 + jitter)))
+
+
+@dataclass
+class CacheEntry:
+    payload: str
+    # False once the entry expired, or when it was picked for an early refresh
+    fresh: bool
+
+
+def parse_entry(entry: str | None, version: str) -> CacheEntry | None:
+    """Unpack ``<version>|<fresh until>|<build seconds>|<payload>``.
+
+    Entries are refreshed early with probability growing as expiry nears and
+    with the time they took to build ("XFetch"), so popular entries are
+    usually rebuilt by a single request before they expire.
+    """
+    if not entry or entry.count("|") < 3:
+        return None
+    entry_version, fresh_until, delta, payload = entry.split("|", 3)
+    if entry_version != version:
+        return None
+    early = (
+        float(delta)
+        * settings.cache.early_refresh_beta
+        * -math.log(1.0 - random.random())
+    )
+    return CacheEntry(payload, time.time() + early < float(fresh_until))
+
+
+async def cache_get(
+    name: str, key: str, version_key: str, redis: Redis
+) -> tuple[CacheEntry | None, str]:
+    """Read an entry and the current version of the data it was built from.
+
+    Args:
+        name (str): cache name used for the hit/miss counters
+        key (str): entry key
+        version_key (str): key holding the version the entry depends on
+        redis (Redis): redis client
+
+    Returns:
+        tuple[CacheEntry | None, str]: entry on a hit, None on a miss, and the
+            version to pass to ``cache_fill`` after reading the database
+    """
+    try:
+        entry, version = await redis.mget(key, version_key)
+    except Exception as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+        cache_stats.miss(name)
+        return None, ""
+    version = version or "0"
+    cached = parse_entry(entry, version)
+    if cached is None:
+        cache_stats.miss(name)
+    elif cached.fresh:
+        cache_stats.hit(name)
+    else:
+        cache_stats.stale(name)
+    return cached, version
+
+
+async def cache_fill(
+    key: str,
+    payload: str,
+    ttl: int,
+    versions: dict[str, str],
+    redis: Redis,
+    tags: list[str] | None = None,
+    tag_member: str = "",
+    delta: float = 0.0,
+) -> bool:
+    """Store an entry unless one of the versions changed since it was read.
+
+    The entry is fresh for ``ttl`` seconds and then kept for ``stale_ttl``
+    more, so ``read_through`` can serve it while it is rebuilt.
+
+    Args:
+        key (str): entry key
+        payload (str): serialized value
+        ttl (int): base time to live in seconds, jittered before use
+        versions (dict[str, str]): version keys and the values observed before
+            the database read; the first one is recorded in the entry
+        redis (Redis): redis client
+        tags (list[str] | None): sets ``tag_member`` is added to, so a later
+            write can find the entries that depend on it
+        tag_member (str): member added to every tag set
+        delta (float): seconds it took to build the value
+
+    Returns:
+        bool: whether the entry was stored
+    """
+    version = next(iter(versions.values()), "")
+    if not version:
+        # The version could not be read, the cache is unavailable
+        return False
+    try:
+        stored = await redis.eval(
+            FILL_SCRIPT,
+            *fill_args(key, payload, ttl, versions, tags, tag_member, delta),
+        )
+    except Exception as e:
+        logger.warning(f"Cache fill failed for {key}: {e}")
+        return False
+    return bool(stored)
+
+
+def fill_args(
+    key: str,
+    payload: str,
+    ttl: int,
+    versions: dict[str, str],
+    tags: list[str] | None = None,
+    tag_member: str = "",
+    delta: float = 0.0,
+) -> tuple:
+    """Arguments of ``FILL_SCRIPT``, for callers pipelining several fills."""
+    tags = tags or []
+    ttl = jittered_ttl(ttl)
+    return (
+        1 + len(versions) + len(tags),
+        key,
+        *versions.keys(),
+        *tags,
+        f"{next(iter(versions.values()))}|{time.time() + ttl}|{delta:.6f}|{payload}",
+        ttl + settings.cache.stale_ttl,
+        settings.cache.version_ttl,
+        len(versions),
+        *versions.values(),
+        tag_member,
+    )
+
+
+async def bump_versions(redis: Redis, *version_keys: str) -> None:
+    """Invalidate every entry built from the given versions."""
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for version_key in version_keys:
+                pipe.incr(version_key)
+                pipe.expire(version_key, settings.cache.version_ttl)
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Cache invalidation failed for {version_keys}: {e}")
+
+
+class LocalCache:
+    """Per-process LRU of parsed values, capped by entries and payload bytes.
+
+    Values are shared between requests and must not be mutated by callers.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+        self.size_bytes = 0
+        # Bumped on every eviction so fills started before it are discarded
+        self.epoch = 0
+
+    def get(self, name: str, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            cache_stats.miss(f"{name}_local")
+            return None
+        self._entries.move_to_end(key)
+        cache_stats.hit(f"{name}_local")
+        return entry[2]
+
+    def set(self, key: str, value: Any, size: int, epoch: int) -> None:
+        if epoch != self.epoch or size > settings.cache.local_max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + settings.cache.local_ttl, size, value)
+        self.size_bytes += size
+        while (
+            len(self._entries) > settings.cache.local_max_entries
+            or self.size_bytes > settings.cache.local_max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+
+    def evict(self, *keys: str) -> None:
+        self.epoch += 1
+        for key in keys:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[1]
+
+
+local_cache = LocalCache()
+
+
+@dataclass
+class CacheLookup:
+    """State observed before a database read, handed back to the fill."""
+
+    version: str
+    epoch: int
+    started: float = field(default_factory=time.monotonic)
+
+
+Loader = Callable[[CacheLookup], Awaitable[BaseModel]]
+
+
+class SingleFlight:
+    """Runs at most one load per key in this process, sharing its result."""
+
+    def __init__(self) -> None:
+        self._flights: dict[str, asyncio.Task] = {}
+
+    async def run(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._flights.get(key)
+        if task is None:
+            task = self._flights[key] = asyncio.create_task(load())
+            task.add_done_callback(lambda done: self._finished(key, done))
+        # A cancelled request must not cancel the load other requests await
+        return await asyncio.shield(task)
+
+    def refresh(self, key: str, load: Callable[[], Awaitable[Any]]) -> None:
+        """Start a load in the background unless one is already running."""
+        if key not in self._flights:
+            task = self._flights[key] = asyncio.create_task(load())
+            task.add_done_callback(lambda done: self._finished(key, done))
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled() and task.exception():
+            logger.error(f"Cache load of {key} failed: {task.exception()}")
+
+
+single_flight = SingleFlight()
+
+
+async def acquire_lock(key: str, redis: Redis) -> str | None:
+    """Take the rebuild lock of an entry across workers.
+
+    Returns:
+        str | None: token to release the lock with, None if another worker
+            holds it
+    """
+    token = uuid.uuid4().hex
+    try:
+        acquired = await redis.set(
+            f"{key}:lock", token, nx=True, px=int(settings.cache.lock_ttl * 1000)
+        )
+    except Exception as e:
+        # Without Redis nothing can be coordinated, rebuild locally
+        logger.warning(f"Cache lock failed for {key}: {e}")
+        return token
+    return token if acquired else None
+
+
+async def release_lock(key: str, token: str, redis: Redis) -> None:
+    try:
+        await redis.eval(RELEASE_SCRIPT, 1, f"{key}:lock", token)
+    except Exception as e:
+        logger.warning(f"Cache unlock failed for {key}: {e}")
+
+
+async def load_locked(
+    key: str,
+    version_key: str,
+    model: type[BaseModel],
+    lookup: CacheLookup,
+    load: Loader,
+    redis: Redis,
+    wait: bool,
+) -> BaseModel | None:
+    """Rebuild an entry while holding its lock.
+
+    When another worker holds the lock, either return None right away
+    (``wait=False``, a stale value is being served) or poll Redis until that
+    worker filled the entry or released the lock, falling back to a local
+    rebuild after ``lock_ttl`` seconds.
+    """
+    token = await acquire_lock(key, redis)
+    if token is None and not wait:
+        return None
+    deadline = time.monotonic() + settings.cache.lock_ttl
+    while token is None and time.monotonic() < deadline:
+        await asyncio.sleep(settings.cache.lock_poll_interval)
+        try:
+            entry, version = await redis.mget(key, version_key)
+        except Exception:
+            break
+        cached = parse_entry(entry, version or "0")
+        if cached is not None:
+            return model.model_validate_json(cached.payload)
+        # Take over if the holder released the lock without filling the entry
+        token = await acquire_lock(key, redis)
+    try:
+        lookup.started = time.monotonic()
+        return await load(lookup)
+    finally:
+        if token is not None:
+            await release_lock(key, token, redis)
+
+
+async def read_through(
+    name: str,
+    key: str,
+    version_key: str,
+    model: type[BaseModel],
+    load: Loader,
+    redis: Redis,
+) -> BaseModel:
+    """Read a model from the local cache, then Redis, then ``load``.
+
+    Concurrent misses share one load per process and one per cluster through
+    a Redis lock. An expired entry is served stale for up to ``stale_ttl``
+    seconds while a single worker rebuilds it in the background.
+
+    Args:
+        name (str): cache name used for the hit/miss counters
+        key (str): entry key
+        version_key (str): key holding the version the entry depends on
+        model (type[BaseModel]): pydantic model of the entry
+        load (Loader): reads the database and fills the cache with
+            ``write_model``, given the state observed before the read
+        redis (Redis): redis client
+
+    Returns:
+        BaseModel: cached or freshly loaded value
+    """
+    value = local_cache.get(name, key)
+    if value is not None:
+        return value
+    epoch = local_cache.epoch
+    cached, version = await cache_get(name, key, version_key, redis)
+    lookup = CacheLookup(version, epoch)
+    if cached is None:
+        return await single_flight.run(
+            key,
+            lambda: load_locked(key, version_key, model, lookup, load, redis, True),
+        )
+    value = model.model_validate_json(cached.payload)
+    if cached.fresh:
+        local_cache.set(key, value, len(cached.payload), epoch)
+    else:
+        single_flight.refresh(
+            key,
+            lambda: load_locked(key, version_key, model, lookup, load, redis, False),
+        )
+    return value
+
+
+async def write_model(
+    key: str,
+    value: BaseModel,
+    ttl: int,
+    versions: dict[str, str],
+    lookup: CacheLookup,
+    redis: Redis,
+    tags: list[str] | None = None,
+    tag_member: str = "",
+) -> int:
+    """Fill Redis and the local cache with a value read from the database.
+
+    See ``cache_fill`` for the arguments; the local copy is kept only when
+    Redis accepted the fill, i.e. no write happened in the meantime. Returns
+    the size of the stored payload, 0 when the fill was rejected.
+    """
+    payload = value.model_dump_json(by_alias=True)
+    delta = time.monotonic() - lookup.started
+    stored = await cache_fill(
+        key, payload, ttl, versions, redis, tags, tag_member, delta
+    )
+    if stored:
+        local_cache.set(key, value, len(payload), lookup.epoch)
+        return len(payload)
+    return 0
+
+
+async def publish_invalidation(redis: Redis, *keys: str) -> None:
+    """Evict keys from the local cache of this and every other process."""
+    local_cache.evict(*keys)
+    try:
+        await redis.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+    except Exception as e:
+        logger.error(f"Cache invalidation publish failed for {keys}: {e}")
+
+
+class CacheInvalidationListener:
+    """Evicts local cache entries named on ``INVALIDATION_CHANNEL``."""
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with clients.get_redis().pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # Anything published while not subscribed was missed
+                    local_cache.clear()
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=5
+                        )
+                        if message and message["type"] == "message":
+                            local_cache.evict(*json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener error: {e}")
+                local_cache.clear()
+                await asyncio.sleep(1)
+
+
+cache_invalidation_listener = CacheInvalidationListener()
@@ -2,15 +2,85 @@ from pydantic import (
     SecretStr,
     Field,
     BaseModel,
+    model_validator,
 )
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Annotated
+from typing import Annotated, Literal
 
 Port = Annotated[int, Field(ge=0, le=65535)]
 
 
 class AppSettings(BaseModel):
     secret_key: str
+    # Documents serialized per chunk by streaming list endpoints
+    stream_batch_size: int = Field(default=500, ge=1)
+    # Largest upload accepted by POST /v1/events/bulk
+    bulk_max_events: int = Field(default=50_000, ge=1)
+
+
+class AuthSettings(BaseModel):
+    # bcrypt cost factor, existing hashes are upgraded on the next login
+    bcrypt_rounds: int = Field(default=12, ge=4, le=31)
+    # Processes hashing passwords, the number of CPUs when unset
+    hash_workers: int | None = Field(default=None, ge=1)
+    # Calls waiting for a worker before logins are rejected with a 503
+    hash_max_pending: int = Field(default=100, ge=0)
+    # Verified tokens kept per process until they expire
+    token_cache_size: int = Field(default=10_000, ge=1)
+    access_token_minutes: int = Field(default=30, ge=1)
+    # Refresh tokens are single use, each refresh issues a new one
+    refresh_token_days: int = Field(default=30, ge=1)
+    # Per-process bloom filter of revoked access tokens, sized for the
+    # revocations expected within one access token lifetime
+    bloom_capacity: int = Field(default=100_000, ge=1)
+    bloom_error_rate: float = Field(default=0.001, gt=0, lt=1)
+
+
+# Defaults of the logging options left unset, per profile
+LOG_PROFILES = {
+    # Colored text with variable values in tracebacks, written synchronously
+    "development": {
+        "level": "DEBUG",
+        "structured": False,
+        "enqueue": False,
+        "diagnose": True,
+        "access_sample_rate": 1.0,
+    },
+    # JSON lines written by a background thread, successful requests sampled
+    "production": {
+        "level": "INFO",
+        "structured": True,
+        "enqueue": True,
+        "diagnose": False,
+        "access_sample_rate": 0.1,
+    },
+}
+
+
+class LogSettings(BaseModel):
+    profile: Literal["development", "production"] = "development"
+    level: (
+        Literal["TRACE", "DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR", "CRITICAL"]
+        | None
+    ) = None
+    # JSON lines instead of colored text
+    structured: bool | None = None
+    # Sinks are written by a background thread instead of the event loop
+    enqueue: bool | None = None
+    # Variable values in tracebacks, slow and may leak secrets
+    diagnose: bool | None = None
+    # Rotated daily, no file when empty
+    file: str | None = "logs/app.log"
+    # Fraction of successful requests logged, failed and slow ones always are
+    access_sample_rate: float | None = Field(default=None, ge=0, le=1)
+    slow_request_seconds: float = Field(default=1.0, gt=0)
+
+    @model_validator(mode="after")
+    def apply_profile(self) -> "LogSettings":
+        for name, value in LOG_PROFILES[self.profile].items():
+            if getattr(self, name) is None:
+                setattr(self, name, value)
+        return self
 
 
 class MongoSettings(BaseModel):
@@ -19,6 +89,13 @@ class MongoSettings(BaseModel):
     db: str
     username: str
     password: SecretStr
+    max_pool_size: int = Field(default=100, ge=1)
+    min_pool_size: int = Field(default=0, ge=0)
+    max_idle_time_ms: int | None = 60_000
+    connect_timeout_ms: int = 5_000
+    server_selection_timeout_ms: int = 5_000
+    socket_timeout_ms: int | None = None
+    heartbeat_frequency_ms: int = 10_000
 
     def url(self) -> str:
         return f'mongodb://{self.username}:{self.password.get_secret_value()}@{self.host}{":" + str(self.port)}/'
@@ -28,12 +105,71 @@ class RedisSettings(BaseModel):
     host: str
     port: Port
     db: int
+    max_connections: int = Field(default=100, ge=1)
+    pool_timeout: float = 5.0
+    socket_timeout: float | None = 5.0
+    socket_connect_timeout: float | None = 5.0
+    health_check_interval: int = 30
+
+
+class WebSocketSettings(BaseModel):
+    # "memory" for a single process, "redis" to fan chat out across workers
+    broadcast_backend: Literal["memory", "redis"] = "memory"
+    # Outbound messages buffered per chat connection before the policy applies
+    send_queue_size: int = Field(default=256, ge=1)
+    slow_client_policy: Literal["drop", "disconnect"] = "disconnect"
+    # Chat messages sent on join and per "load older" page
+    chat_history_limit: int = Field(default=50, ge=1)
+    chat_history_max_limit: int = Field(default=200, ge=1)
+    # Write-behind persistence of chat messages
+    chat_flush_batch_size: int = Field(default=500, ge=1)
+    chat_flush_interval: float = Field(default=0.5, gt=0)
+    chat_buffer_max_pending: int = Field(default=10_000, ge=1)
+    # Longest wait between flushes while Mongo keeps failing
+    chat_flush_max_backoff: float = Field(default=30.0, gt=0)
+
+
+class CacheSettings(BaseModel):
+    # Time to live in seconds of each kind of cached entry
+    event_ttl: int = Field(default=3600, ge=1)
+    event_users_ttl: int = Field(default=360, ge=1)
+    # Kept short, time filters are relative to the moment of the query
+    events_query_ttl: int = Field(default=30, ge=1)
+    # Fraction by which TTLs are randomly stretched or shortened
+    ttl_jitter: float = Field(default=0.1, ge=0, lt=1)
+    # Version keys must outlive every entry built from them
+    version_ttl: int = Field(default=86_400, ge=1)
+    user_ttl: int = Field(default=3600, ge=1)
+    # Bytes of serialized users kept in Redis, the oldest fills are evicted
+    # first. Redis adds its own overhead per key on top of the payloads.
+    user_max_bytes: int = Field(default=67_108_864, ge=1)
+    # Cache the new profile on update instead of waiting for the next read
+    user_write_through: bool = False
+    # Seconds an expired entry is served while a single worker rebuilds it
+    stale_ttl: int = Field(default=60, ge=0)
+    # How eagerly entries are refreshed before expiry, 0 disables it
+    early_refresh_beta: float = Field(default=1.0, ge=0)
+    # Rebuild lock held across workers, waiters poll for the new entry
+    lock_ttl: float = Field(default=10.0, gt=0)
+    lock_poll_interval: float = Field(default=0.05, gt=0)
+    # Per-process cache of parsed entries in front of Redis
+    local_max_entries: int = Field(default=2_000, ge=1)
+    local_max_bytes: int = Field(default=16 * 1024 * 1024, ge=1)
+    local_ttl: float = Field(default=5.0, gt=0)
+    # Per-process attendee timelines for free/busy queries, kept current by
+    # event writes, the TTL only bounds the damage of a missed change
+    freebusy_max_users: int = Field(default=10_000, ge=1)
+    freebusy_ttl: float = Field(default=300.0, gt=0)
 
 
 class Settings(BaseSettings):
     mongo: MongoSettings
     redis: RedisSettings
     app: AppSettings
+    websockets: WebSocketSettings = WebSocketSettings()
+    auth: AuthSettings = AuthSettings()
+    cache: CacheSettings = CacheSettings()
+    log: LogSettings = LogSettings()
     model_config = SettingsConfigDict(
         env_file=".env",  # Pokud není definováno, nenačte se žádný soubor.
         env_file_encoding="utf-8",  # Pokud není definováno, použije se kódování systému
@@ -1,29 +1,77 @@
-from typing import Any
-from collections.abc import Generator
-from pymongo import MongoClient
-from redis import Redis
+from collections.abc import AsyncGenerator
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.database import AsyncDatabase
+from redis.asyncio import BlockingConnectionPool, Redis
 from app.config import settings
-from pymongo.synchronous.database import Database
-
-
-def get_mongo_client() -> Generator[MongoClient, Any, None]:
-    try:
-        db: Database = MongoClient(settings.mongo.url())["app"]
-        yield db
-    finally:
-        db.client.close()
-
-
-def get_redis_client() -> Generator[Redis, Any, None]:
-    redis = Redis(
-        host=settings.redis.host,
-        port=settings.redis.port,
-        db=settings.redis.db,
-        decode_responses=True,
-    )
-
-    try:
-        if redis.ping():
-            yield redis
-    finally:
-        redis.close()
+from app.metrics import InstrumentedRedis, MongoCommandMetrics
+
+
+class DatabaseClients:
+    """Process-wide pooled clients, created on startup and closed on shutdown."""
+
+    def __init__(self) -> None:
+        self.mongo: AsyncMongoClient | None = None
+        self.redis_pool: BlockingConnectionPool | None = None
+
+    def connect(self) -> None:
+        if self.mongo is None:
+            self.mongo = AsyncMongoClient(
+                settings.mongo.url(),
+                maxPoolSize=settings.mongo.max_pool_size,
+                minPoolSize=settings.mongo.min_pool_size,
+                maxIdleTimeMS=settings.mongo.max_idle_time_ms,
+                connectTimeoutMS=settings.mongo.connect_timeout_ms,
+                serverSelectionTimeoutMS=settings.mongo.server_selection_timeout_ms,
+                socketTimeoutMS=settings.mongo.socket_timeout_ms,
+                heartbeatFrequencyMS=settings.mongo.heartbeat_frequency_ms,
+                event_listeners=[MongoCommandMetrics()],
+            )
+        if self.redis_pool is None:
+            self.redis_pool = BlockingConnectionPool(
+                host=settings.redis.host,
+                port=settings.redis.port,
+                db=settings.redis.db,
+                decode_responses=True,
+                max_connections=settings.redis.max_connections,
+                timeout=settings.redis.pool_timeout,
+                socket_timeout=settings.redis.socket_timeout,
+                socket_connect_timeout=settings.redis.socket_connect_timeout,
+                health_check_interval=settings.redis.health_check_interval,
+            )
+
+    async def close(self) -> None:
+        if self.mongo is not None:
+            await self.mongo.close()
+            self.mongo = None
+        if self.redis_pool is not None:
+            await self.redis_pool.disconnect()
+            self.redis_pool = None
+
+    async def ping(self) -> None:
+        """Check both servers are reachable, raising if either is down."""
+        await self.get_mongo().admin.command("ping")
+        await self.get_redis().ping()
+
+    def get_mongo(self) -> AsyncMongoClient:
+        if self.mongo is None:
+            self.connect()
+        return self.mongo
+
+    def get_db(self) -> AsyncDatabase:
+        return self.get_mongo()["app"]
+
+    def get_redis(self) -> Redis:
+        if self.redis_pool is None:
+            self.connect()
+        return InstrumentedRedis(connection_pool=self.redis_pool)
+
+
+clients = DatabaseClients()
+
+
+async def get_mongo_client() -> AsyncGenerator[AsyncDatabase, None]:
+    yield clients.get_db()
+
+
+async def get_redis_client() -> AsyncGenerator[Redis, None]:
+    yield clients.get_redis()
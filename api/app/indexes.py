@@ -0,0 +1,236 @@
+"""Index declarations and query plan checks for every collection.
+
+Run ``python -m app.indexes create`` to build missing indexes, or
+``python -m app.indexes verify`` to explain each controller query and fail
+if any of them falls back to a collection scan.
+
+Unique indexes enforce constraints the controllers rely on, e.g. unique event
+titles, so the application does not start without them. They can not be
+built over existing duplicates: ``python -m app.indexes duplicates`` lists
+those, rename or delete them and restart.
+"""
+
+import argparse
+import asyncio
+from datetime import UTC, datetime, timedelta
+import sys
+from bson import ObjectId
+from loguru import logger
+from pymongo import ASCENDING, IndexModel
+from pymongo.asynchronous.database import AsyncDatabase
+from app.databases import clients
+from app.src.events.controllers import build_events_query
+from app.src.websockets.controllers import CHAT_HISTORY_SORT
+
+INDEXES: dict[str, list[IndexModel]] = {
+    "events": [
+        IndexModel([("attendees", ASCENDING)], name="attendees"),
+        IndexModel([("title", ASCENDING)], name="title_unique", unique=True),
+        # Sort fields are paired with _id to back keyset pagination
+        IndexModel([("title", ASCENDING), ("_id", ASCENDING)], name="title_id"),
+        IndexModel(
+            [("start_time", ASCENDING), ("_id", ASCENDING)], name="start_time_id"
+        ),
+        IndexModel([("end_time", ASCENDING), ("_id", ASCENDING)], name="end_time_id"),
+    ],
+    "users": [
+        IndexModel([("username", ASCENDING), ("_id", ASCENDING)], name="username_id"),
+        IndexModel([("email", ASCENDING), ("_id", ASCENDING)], name="email_id"),
+    ],
+    "chat": [
+        IndexModel(
+            [("event_id", ASCENDING), *CHAT_HISTORY_SORT], name="event_id_timestamp"
+        ),
+    ],
+}
+
+
+async def ensure_indexes(mongo: AsyncDatabase, unique: bool | None = None) -> None:
+    """Create the declared indexes that do not exist yet.
+
+    Every index is created on its own, so one that fails, e.g. a unique index
+    over duplicates, does not prevent the others.
+
+    Args:
+        mongo (AsyncDatabase): mongo database
+        unique (bool | None): only unique (True) or non-unique (False)
+            indexes, all of them when None
+
+    Raises:
+        RuntimeError: if any index could not be created
+    """
+    failed = []
+    for collection_name, indexes in INDEXES.items():
+        collection = mongo[collection_name]
+        existing = await collection.index_information()
+        for index in indexes:
+            name = index.document["name"]
+            if name in existing or (
+                unique is not None and index.document.get("unique", False) != unique
+            ):
+                continue
+            try:
+                await collection.create_indexes([index])
+                logger.info(f"Created index {name} on {collection_name}")
+            except Exception as e:
+                logger.error(f"Index {name} on {collection_name} failed: {e}")
+                failed.append(f"{collection_name}.{name}")
+    if failed:
+        raise RuntimeError(f"Could not create indexes: {', '.join(failed)}")
+
+
+async def find_duplicates(mongo: AsyncDatabase) -> list[str]:
+    """Find the documents preventing unique indexes from being built.
+
+    Args:
+        mongo (AsyncDatabase): mongo database
+
+    Returns:
+        list[str]: a description of every group of duplicates
+    """
+    duplicates = []
+    for collection_name, indexes in INDEXES.items():
+        for index in indexes:
+            if not index.document.get("unique", False):
+                continue
+            fields = list(index.document["key"])
+            groups = mongo[collection_name].aggregate(
+                [
+                    {
+                        "$group": {
+                            "_id": {field: f"${field}" for field in fields},
+                            "ids": {"$push": "$_id"},
+                        }
+                    },
+                    {"$match": {"ids.1": {"$exists": True}}},
+                ]
+            )
+            async for group in await groups:
+                duplicate = (
+                    f"{collection_name} {group['_id']}: "
+                    f"{', '.join(map(str, group['ids']))}"
+                )
+                duplicates.append(duplicate)
+                logger.error(f"Duplicates of {index.document['name']}: {duplicate}")
+    return duplicates
+
+
+def controller_queries() -> dict[str, tuple[str, dict, list | None]]:
+    """Representative filter and sort of every indexed controller query."""
+    some_id = ObjectId()
+    return {
+        "events.get_events(attend)": (
+            "events",
+            build_events_query(attend=[str(some_id)]),
+            None,
+        ),
+        "events.get_events(include_pass_event)": (
+            "events",
+            build_events_query(include_pass_event=True),
+            None,
+        ),
+        "events.get_events(include_upcoming_event)": (
+            "events",
+            build_events_query(include_upcoming_event=True),
+            None,
+        ),
+        "events.get_events(include_current_event)": (
+            "events",
+            build_events_query(include_current_event=True),
+            None,
+        ),
+        "events.get_events(include_pass_event, include_current_event)": (
+            "events",
+            build_events_query(include_pass_event=True, include_current_event=True),
+            None,
+        ),
+        "events.get_events(from, to)": (
+            "events",
+            build_events_query(
+                time_from=datetime.now(UTC),
+                time_to=datetime.now(UTC) + timedelta(days=7),
+            ),
+            None,
+        ),
+        "events.get_events(all time filters)": (
+            "events",
+            build_events_query(
+                include_pass_event=True,
+                include_upcoming_event=True,
+                include_current_event=True,
+            ),
+            None,
+        ),
+        "events.validate_event_users": (
+            "users",
+            {"_id": {"$in": [some_id, ObjectId()]}},
+            None,
+        ),
+        "websockets.chat_websocket_endpoint(attendee)": (
+            "events",
+            {"_id": some_id, "attendees": {"$in": [some_id]}},
+            None,
+        ),
+        "auth.get_access_token(username)": ("users", {"username": "username"}, None),
+        "auth.register_user(email)": ("users", {"email": "email"}, None),
+        "websockets.get_chat_history": (
+            "chat",
+            {"event_id": str(some_id)},
+            CHAT_HISTORY_SORT,
+        ),
+    }
+
+
+def plan_stages(plan: dict) -> set[str]:
+    """Collect every stage name of an explain() plan tree."""
+    stages = {plan["stage"]} if "stage" in plan else set()
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages |= plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages |= plan_stages(child)
+    return stages
+
+
+async def verify_query_plans(mongo: AsyncDatabase) -> list[str]:
+    """Explain every controller query and return those using a COLLSCAN.
+
+    Args:
+        mongo (AsyncDatabase): mongo database
+
+    Returns:
+        list[str]: names of the queries that scan a whole collection
+    """
+    collection_scans = []
+    for name, (collection_name, query, sort) in controller_queries().items():
+        cursor = mongo[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain: dict = await cursor.explain()
+        stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+        if "COLLSCAN" in stages:
+            collection_scans.append(name)
+            logger.error(f"{name} uses a collection scan: {sorted(stages)}")
+        else:
+            logger.info(f"{name}: {sorted(stages)}")
+    return collection_scans
+
+
+async def main(command: str) -> int:
+    clients.connect()
+    try:
+        mongo = clients.get_db()
+        if command == "duplicates":
+            return 1 if await find_duplicates(mongo) else 0
+        await ensure_indexes(mongo)
+        if command == "verify" and await verify_query_plans(mongo):
+            return 1
+        return 0
+    finally:
+        await clients.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=["create", "verify", "duplicates"])
+    sys.exit(asyncio.run(main(parser.parse_args().command)))
@@ -0,0 +1,79 @@
+"""Logging sinks and the request log, configured by ``settings.log``.
+
+Messages are only formatted once a sink accepts their level, so hot paths
+pass values as arguments (``logger.debug("{} users", count)``) instead of
+f-strings, which are built even when the level is disabled. Arguments given
+by keyword also become fields of the structured output.
+
+With ``enqueue`` the formatted lines are handed to a background thread, so
+the event loop never waits for the terminal or the disk. Call ``flush`` on
+shutdown to write what is still queued.
+"""
+
+import json
+import random
+import sys
+import traceback
+from app.config import LogSettings, settings
+from loguru import logger
+
+TEXT_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss.SSS zz}</green> | <level>{level: <8}</level> | <yellow>Line {line: >4} ({file}):</yellow> <b>{message}</b>"  # noqa: E501
+
+
+def json_format(record: dict) -> str:
+    """One JSON object per line, extra fields included."""
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "module": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+    }
+    entry.update(
+        (name, value) for name, value in record["extra"].items() if name != "json"
+    )
+    if record["exception"] is not None:
+        entry["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    # The returned template is formatted again, the line must not be
+    record["extra"]["json"] = json.dumps(entry, default=str)
+    return "{extra[json]}\n"
+
+
+def configure_logging(log: LogSettings) -> None:
+    """Replace every sink with the ones of the configured profile."""
+    logger.remove()
+    options = {
+        "level": log.level,
+        "format": json_format if log.structured else TEXT_FORMAT,
+        "backtrace": log.diagnose,
+        "diagnose": log.diagnose,
+        "enqueue": log.enqueue,
+    }
+    logger.add(sys.stderr, colorize=not log.structured, **options)
+    if log.file:
+        logger.add(
+            log.file, colorize=False, rotation="00:00", retention="5 days", **options
+        )
+
+
+async def flush() -> None:
+    """Wait until queued messages are written."""
+    await logger.complete()
+
+
+def log_request(method: str, path: str, status: int, seconds: float) -> None:
+    """Log a finished request, successful fast ones are sampled."""
+    if (
+        status < 400
+        and seconds < settings.log.slow_request_seconds
+        and random.random() >= settings.log.access_sample_rate
+    ):
+        return
+    logger.info(
+        "{method} {path} {status} {duration_ms:.1f} ms",
+        method=method,
+        path=path,
+        status=status,
+        duration_ms=seconds * 1000,
+    )
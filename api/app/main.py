@@ -1,10 +1,23 @@
-import sys
+import asyncio
+from contextlib import asynccontextmanager
 import time
-from app.src.auth.utils import verify_jwt_token
+from app.cache import cache_invalidation_listener, cache_stats
+from app.config import settings
+from app.databases import clients
+from app.indexes import ensure_indexes
+from app.log import configure_logging, flush, log_request
+from app.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from app.src.auth.credentials import credential_service
+from app.src.auth.revocation import revocation_list
+from app.src.events.freebusy import freebusy_index
+from app.src.websockets.broadcast import chat_broadcast
+from app.src.websockets.chat_buffer import chat_buffer
+from app.src.websockets.connections import stats as connection_stats
+from app.src.websockets.reminders import reminder_scheduler
+from app.src.auth.middleware import AuthMiddleware, token_cache
 from fastapi import FastAPI, Request, Response
 from app.src.routers import router
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from loguru import logger
 
 public_endpoints = [
@@ -12,39 +25,71 @@ public_endpoints = [
     "/openapi.json",
     "/v1/auth/login",
     "/v1/auth/register",
+    "/v1/auth/refresh",
+    "/metrics",
 ]
 
-log_level = "DEBUG"
-log_format = "<green>{time:YYYY-MM-DD HH:mm:ss.SSS zz}</green> | <level>{level: <8}</level> | <yellow>Line {line: >4} ({file}):</yellow> <b>{message}</b>"  # noqa: E501
-logger.add(
-    sys.stderr,
-    level=log_level,
-    format=log_format,
-    colorize=True,
-    backtrace=True,
-    diagnose=True,
-)
-logger.add(
-    "logs/app.log",
-    level=log_level,
-    format=log_format,
-    colorize=False,
-    backtrace=True,
-    diagnose=True,
-    rotation="00:00",
-    retention="5 days",
-)
+configure_logging(settings.log)
+
+registry.add_stats("cache", cache_stats.snapshot, label="cache")
+registry.add_stats("auth_credentials", credential_service.snapshot)
+registry.add_stats("auth_token_cache", token_cache.snapshot)
+registry.add_stats("auth_revocation", revocation_list.stats)
+registry.add_stats("websocket_send", connection_stats.snapshot)
+registry.add_stats("websocket", chat_buffer.stats)
+
+
+def log_index_errors(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception():
+        logger.error(f"Index creation failed: {task.exception()}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    clients.connect()
+    try:
+        await clients.ping()
+    except Exception as e:
+        logger.error(f"Database health check failed: {e}")
+    # Unique indexes enforce constraints the controllers rely on, startup
+    # fails without them, see app/indexes.py for removing duplicates
+    await ensure_indexes(clients.get_db(), unique=True)
+    # Other index builds run in the background so they never delay startup
+    index_task = asyncio.create_task(ensure_indexes(clients.get_db(), unique=False))
+    index_task.add_done_callback(log_index_errors)
+    await cache_invalidation_listener.start()
+    await freebusy_index.start()
+    await credential_service.start()
+    await revocation_list.start()
+    await reminder_scheduler.start()
+    await chat_broadcast.start()
+    await chat_buffer.start()
+    yield
+    await chat_buffer.stop()
+    await chat_broadcast.stop()
+    await reminder_scheduler.stop()
+    await revocation_list.stop()
+    await credential_service.stop()
+    await freebusy_index.stop()
+    await cache_invalidation_listener.stop()
+    await clients.close()
+    await flush()
+
 
 app = FastAPI(
     docs_url="/",
+    lifespan=lifespan,
 )
 
+# Added before CORS so that rejected requests still get CORS headers
+app.add_middleware(AuthMiddleware, public_paths=public_endpoints)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Process-Time"],
 )
 
 
@@ -55,30 +100,18 @@ async def add_process_time_header(request: Request, call_next):
     process_time = time.perf_counter() - start_time
     response.headers["X-Process-Time"] = str(process_time)
 
-    if request.url.path not in public_endpoints:
-        token: str = request.headers.get("Authorization", "Bearer asd")
-        if not token:
-            logger.info(
-                f"{request.method} {request.url.path} {401} {'Missing token'}  {process_time}"  # noqa: E501
-            )
-            return JSONResponse(status_code=401, content={"detail": "Missing token"})
-        if "Bearer " not in token:
-            logger.info(
-                f"{request.method} {request.url.path} {401} {'Invalid token'}  {process_time}"  # noqa: E501
-            )
-            return JSONResponse(status_code=401, content={"detail": "Invalid token"})
-        # token = token.split("Bearer ")[1]
-        # if not verify_jwt_token(token):
-        #     logger.info(
-        #         f"{request.method} {request.url.path} {401} {'Invalid token'}  {process_time}"  # noqa: E501
-        #     )
-        #     return JSONResponse(status_code=401, content={"detail": "Invalid token"})
-
-    logger.info(
-        f"{request.method} {request.url.path} {response.status_code} {process_time}"
-    )
+    log_request(request.method, request.url.path, response.status_code, process_time)
 
     return response
 
 
+# Outermost, so that the time spent in other middleware is measured too
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def endp_get_metrics() -> Response:
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
 app.include_router(router)
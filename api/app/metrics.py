@@ -0,0 +1,326 @@
+"""Prometheus metrics in the text exposition format, served on ``/metrics``.
+
+Counters and histograms are dicts keyed by label values and updated in
+place, an observation is a bisection and two additions. Everything runs on
+the event loop, so no locks are needed. Statistics the app already keeps
+(``cache_stats``, ``credential_service`` and others) are read only when
+scraped, through ``registry.add_stats``.
+
+Metrics are per process: with several workers, scrape each one or expect
+the values of whichever worker answers.
+
+Mongo commands and Redis calls are labeled with the name of the endpoint
+function that issued them, which calls a single controller function.
+Calls made outside a request, by listeners and schedulers, are labeled
+``background``, and those made by middleware before routing ``middleware``.
+"""
+
+import bisect
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextvars import ContextVar
+import time
+from typing import Any
+from pymongo import monitoring
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a cache hit to a slow aggregation
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Scope of the request being handled
+current_scope: ContextVar[Scope | None] = ContextVar("current_scope", default=None)
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return f"{{{pairs}}}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labels: tuple[str, ...] = ()
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.values: defaultdict[tuple[str, ...], float] = defaultdict(float)
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] += amount
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labels, labels)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] -= amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+        # Observations per bucket, not cumulative, the last one is +Inf
+        self.counts: dict[tuple[str, ...], list[int]] = {}
+        self.sums: defaultdict[tuple[str, ...], float] = defaultdict(float)
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self.counts.get(labels)
+        if counts is None:
+            counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def samples(self) -> Iterator[str]:
+        names = (*self.labels, "le")
+        for labels, counts in self.counts.items():
+            total = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+                total += count
+                bucket_labels = format_labels(names, (*labels, str(bound)))
+                yield f"{self.name}_bucket{bucket_labels} {total}"
+            label_text = format_labels(self.labels, labels)
+            yield f"{self.name}_sum{label_text} {self.sums[labels]}"
+            yield f"{self.name}_count{label_text} {total}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+        self.stats: list[tuple[str, Callable[[], dict[str, Any]], str | None]] = []
+
+    def counter(self, *args: Any, **kwargs: Any) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, *args: Any, **kwargs: Any) -> Gauge:
+        metric = Gauge(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args: Any, **kwargs: Any) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def add_stats(
+        self,
+        prefix: str,
+        snapshot: Callable[[], dict[str, Any]],
+        label: str | None = None,
+    ) -> None:
+        """Export a statistics snapshot as ``{prefix}_{key}`` values.
+
+        A snapshot of dicts, e.g. per cache name, is exported with the outer
+        keys as values of ``label``.
+        """
+        self.stats.append((prefix, snapshot, label))
+
+    def render_stats(self) -> Iterator[str]:
+        for prefix, snapshot, label in self.stats:
+            values: defaultdict[str, list[str]] = defaultdict(list)
+            for key, value in snapshot().items():
+                if label is None:
+                    values[f"{prefix}_{key}"].append(f"{prefix}_{key} {value}")
+                    continue
+                for name, nested in value.items():
+                    labels = format_labels((label,), (key,))
+                    values[f"{prefix}_{name}"].append(
+                        f"{prefix}_{name}{labels} {nested}"
+                    )
+            for name, samples in values.items():
+                yield f"# TYPE {name} untyped"
+                yield from samples
+
+    def render(self) -> str:
+        lines = [line for metric in self.metrics for line in metric.render()]
+        lines.extend(self.render_stats())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response.",
+    ("method", "route", "status"),
+    REQUEST_BUCKETS,
+)
+websocket_connections = registry.gauge(
+    "websocket_connections", "Accepted WebSocket connections.", ("route",)
+)
+mongo_command_seconds = registry.histogram(
+    "mongo_command_duration_seconds",
+    "Mongo commands by the endpoint that issued them.",
+    ("handler", "command"),
+)
+mongo_command_failures = registry.counter(
+    "mongo_command_failures_total",
+    "Failed Mongo commands by the endpoint that issued them.",
+    ("handler", "command"),
+)
+redis_command_seconds = registry.histogram(
+    "redis_command_duration_seconds",
+    "Redis commands and pipelines by the endpoint that issued them.",
+    ("handler", "command"),
+)
+reminder_lag_seconds = registry.histogram(
+    "reminder_lag_seconds",
+    "Delay between a reminder's due time and the moment it is claimed.",
+    buckets=LAG_BUCKETS,
+)
+broadcast_fanout_seconds = registry.histogram(
+    "chat_broadcast_fanout_seconds",
+    "Time to hand a chat message to every local subscriber of its channel.",
+)
+broadcast_deliveries = registry.counter(
+    "chat_broadcast_deliveries_total",
+    "Chat messages handed to local subscribers.",
+)
+
+
+def route_path(scope: Scope) -> str:
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+def current_handler() -> str:
+    scope = current_scope.get()
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    return route.name if route is not None else "middleware"
+
+
+class MetricsMiddleware:
+    """Times HTTP requests and counts WebSocket connections per route."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        token = current_scope.set(scope)
+        started = time.perf_counter()
+        status = 500
+        accepted: str | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, accepted
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "websocket.accept":
+                # Routing is done by the time a connection is accepted
+                accepted = route_path(scope)
+                websocket_connections.inc(accepted)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_scope.reset(token)
+            if scope["type"] == "http":
+                http_request_seconds.observe(
+                    time.perf_counter() - started,
+                    scope["method"],
+                    route_path(scope),
+                    str(status),
+                )
+            elif accepted is not None:
+                websocket_connections.dec(accepted)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Command listener recording the duration of every Mongo command."""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        mongo_command_seconds.observe(
+            event.duration_micros / 1_000_000, current_handler(), event.command_name
+        )
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        mongo_command_failures.inc(current_handler(), event.command_name)
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            redis_command_seconds.observe(
+                time.perf_counter() - started, current_handler(), "PIPELINE"
+            )
+
+
+class InstrumentedRedis(Redis):
+    """Redis client recording the duration of every command and pipeline.
+
+    Pub/sub connections are not timed, they wait for messages.
+    """
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            redis_command_seconds.observe(
+                time.perf_counter() - started, current_handler(), str(args[0]).upper()
+            )
+
+    def pipeline(
+        self, transaction: bool = True, shard_hint: str | None = None
+    ) -> InstrumentedPipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
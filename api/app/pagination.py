@@ -0,0 +1,183 @@
+import base64
+from typing import Any
+from bson import ObjectId, json_util
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pymongo import ASCENDING, DESCENDING
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.cursor import AsyncCursor
+
+
+def encode_cursor(values: list[Any]) -> str:
+    """Encode the sort key of the last returned document as an opaque cursor.
+
+    Args:
+        values (list[Any]): sort key values, e.g. a timestamp and an ObjectId
+
+    Returns:
+        str: URL safe cursor
+    """
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    """Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor (str): cursor received from the client
+
+    Returns:
+        list[Any]: sort key values
+    """
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def parse_sort(sort: str | None, allowed: dict[str, type]) -> tuple[str, int, type]:
+    """Parse a ``field`` or ``-field`` sort parameter.
+
+    Args:
+        sort (str | None): sort parameter, ``-`` prefix for descending order
+        allowed (dict[str, type]): fields that may be sorted on and the type of
+            their values
+
+    Returns:
+        tuple[str, int, type]: mongo field name, direction and value type
+    """
+    if not sort:
+        return "_id", ASCENDING, ObjectId
+    direction = DESCENDING if sort.startswith("-") else ASCENDING
+    field = sort.lstrip("-+")
+    if field not in allowed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort field, allowed: {', '.join(sorted(allowed))}",
+        )
+    return field, direction, allowed[field]
+
+
+def parse_projection(fields: str | None, allowed: set[str]) -> dict | None:
+    """Parse a comma separated ``fields`` parameter into a mongo projection.
+
+    Args:
+        fields (str | None): comma separated field names
+        allowed (set[str]): fields that may be requested
+
+    Returns:
+        dict | None: projection, or None to return whole documents
+    """
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    invalid = requested - allowed
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid fields: {', '.join(sorted(invalid))}",
+        )
+    return {field: 1 for field in requested}
+
+
+def find_page(
+    collection: AsyncCollection,
+    query: dict,
+    sort_field: str = "_id",
+    direction: int = ASCENDING,
+    after: str | None = None,
+    limit: int | None = None,
+    projection: dict | None = None,
+    sort_type: type = ObjectId,
+) -> AsyncCursor:
+    """Build a keyset paginated find.
+
+    Documents are ordered by ``sort_field`` and then ``_id``, so cursors stay
+    stable while documents are inserted or removed.
+
+    Args:
+        collection (AsyncCollection): collection to query
+        query (dict): mongo filter
+        sort_field (str): field to sort on
+        direction (int): ASCENDING or DESCENDING
+        after (str | None): cursor returned with the previous page
+        limit (int | None): page size, all documents when None
+        projection (dict | None): mongo projection
+        sort_type (type): type of the ``sort_field`` values, cursor values of
+            any other type are rejected as they could be query operators
+
+    Returns:
+        AsyncCursor: cursor over the requested page
+    """
+    operator = "$gt" if direction == ASCENDING else "$lt"
+    if after:
+        cursor = decode_cursor(after)
+        if sort_field == "_id" and len(cursor) == 1 and isinstance(cursor[0], ObjectId):
+            keyset = {"_id": {operator: cursor[0]}}
+        elif (
+            sort_field != "_id"
+            and len(cursor) == 2
+            # Documents without the field have a None sort value
+            and (cursor[0] is None or isinstance(cursor[0], sort_type))
+            and isinstance(cursor[1], ObjectId)
+        ):
+            value, last_id = cursor
+            keyset = {
+                "$or": [
+                    {sort_field: {operator: value}},
+                    {sort_field: value, "_id": {operator: last_id}},
+                ]
+            }
+        else:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = {"$and": [query, keyset]} if query else keyset
+
+    sort = [(sort_field, direction)]
+    if sort_field != "_id":
+        sort.append(("_id", direction))
+    if projection is not None:
+        # The sort key is needed to build the next cursor
+        projection = {**projection, sort_field: 1}
+
+    find = collection.find(query, projection).sort(sort)
+    if limit:
+        find = find.limit(limit)
+    return find
+
+
+async def paginate(
+    collection: AsyncCollection,
+    query: dict,
+    sort_field: str = "_id",
+    direction: int = ASCENDING,
+    after: str | None = None,
+    limit: int | None = None,
+    projection: dict | None = None,
+    sort_type: type = ObjectId,
+) -> tuple[list[dict], str | None]:
+    """Run a keyset paginated find, see ``find_page``.
+
+    Returns:
+        tuple[list[dict], str | None]: documents and the cursor of the next page
+    """
+    documents: list[dict] = await find_page(
+        collection, query, sort_field, direction, after, limit, projection, sort_type
+    ).to_list()
+
+    next_cursor = None
+    if limit and len(documents) == limit:
+        last = documents[-1]
+        next_cursor = encode_cursor(
+            [last["_id"]]
+            if sort_field == "_id"
+            else [last.get(sort_field), last["_id"]]
+        )
+    return documents, next_cursor
+
+
+def encode_documents(documents: list[dict]) -> list[dict]:
+    """Make projected documents JSON serializable (ObjectIds become strings)."""
+    return jsonable_encoder(documents, custom_encoder={ObjectId: str})
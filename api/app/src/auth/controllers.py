@@ -1,34 +1,65 @@
-from app.src.auth.schemas import Token
-from app.src.auth.utils import generate_jwt_token, verify_password
+from app.config import settings
+from app.src.auth.credentials import credential_service
+from app.src.auth.revocation import (
+    consume_refresh_token,
+    create_refresh_token,
+    refresh_key,
+    revocation_list,
+)
+from app.src.auth.schemas import LogoutRequest, RefreshRequest, Token
+from app.src.auth.utils import generate_jwt_token
 from app.src.users.schemas import UserCreate
-from fastapi import HTTPException
+from bson import ObjectId
+from fastapi import HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from loguru import logger
-from pymongo import MongoClient
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
 from pymongo.results import InsertOneResult
-from pymongo.synchronous.collection import Collection
+from redis.asyncio import Redis
 
 
-def get_access_token(
-    data: OAuth2PasswordRequestForm, mongo: MongoClient
+async def issue_tokens(user: dict, redis: Redis) -> Token:
+    """Access token and a new refresh token for a user document.
+
+    Args:
+        user (dict): user with ``_id``, email, username and names
+        redis (Redis): redis client
+
+    Returns:
+        Token: access and refresh token
+    """
+    user_id = str(user["_id"])
+    token: str = generate_jwt_token(
+        user_id,
+        user["email"],
+        user["username"],
+        user["first_name"],
+        user["last_name"],
+    )
+    return Token(
+        access_token=token,
+        token_type="Bearer",
+        refresh_token=await create_refresh_token(user_id, redis),
+        expires_in=settings.auth.access_token_minutes * 60,
+    )
+
+
+async def get_access_token(
+    data: OAuth2PasswordRequestForm, mongo: AsyncDatabase, redis: Redis
 ) -> dict[str, str] | None:
     try:
-        collection: Collection = mongo["users"]
-        user = collection.find_one({"username": data.username})
+        collection: AsyncCollection = mongo["users"]
+        user = await collection.find_one({"username": data.username})
         if not user:
-            print("User not found")
+            logger.warning("Login attempt for unknown user {}", data.username)
             raise HTTPException(status_code=404, detail="User not found")
 
-        if not verify_password(data.password, user["password"]):
+        if not await credential_service.verify(data.password, user["password"]):
             raise HTTPException(status_code=401, detail="Invalid password")
-        token: str = generate_jwt_token(
-            str(user["_id"]),
-            user["email"],
-            user["username"],
-            user["first_name"],
-            user["last_name"],
-        )
-        return Token(access_token=token, token_type="Bearer")
+        if credential_service.needs_rehash(user["password"]):
+            await rehash_password(user, data.password, collection)
+        return await issue_tokens(user, redis)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -36,40 +67,112 @@ def get_access_token(
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
-def register_user(data: UserCreate, mongo: MongoClient) -> dict[str, str] | None:
+async def rehash_password(
+    user: dict, password: str, collection: AsyncCollection
+) -> None:
+    """Store the password hashed with the configured cost factor.
+
+    Called on login, while the plain password is known. The update only
+    applies if the stored hash did not change meanwhile.
+    """
+    hashed = await credential_service.hash(password)
+    result = await collection.update_one(
+        {"_id": user["_id"], "password": user["password"]},
+        {"$set": {"password": hashed}},
+    )
+    if result.modified_count:
+        credential_service.rehashed += 1
+        logger.info(f"Rehashed password of user {user['_id']}")
+
+
+async def register_user(
+    data: UserCreate, mongo: AsyncDatabase, redis: Redis
+) -> dict[str, str] | None:
     """Register a new user.
 
     Args:
         data (UserCreate):  pydantic model for user creation
-        mongo (MongoClient): mongo client
+        mongo (AsyncDatabase): mongo database
+        redis (Redis): redis client
     Returns:
         dict[str, str] | None: JWT token
     """
     try:
-        collection: Collection = mongo["users"]
+        collection: AsyncCollection = mongo["users"]
         # Check if user with email or username already exists
-        user = collection.find_one({"email": data.email})
+        user = await collection.find_one({"email": data.email})
         if user:
             raise HTTPException(
                 status_code=409, detail="User with email already exists"
             )
-        user = collection.find_one({"username": data.username})
+        user = await collection.find_one({"username": data.username})
         if user:
             raise HTTPException(
                 status_code=409, detail="User with username already exists"
             )
         # If user with email does not exist, insert user into database
-        user: InsertOneResult = collection.insert_one(data.model_dump(by_alias=True))
-        token: str = generate_jwt_token(
-            str(user.inserted_id),
-            data.email,
-            data.username,
-            data.first_name,
-            data.last_name,
+        user: InsertOneResult = await collection.insert_one(
+            {
+                **data.model_dump(by_alias=True),
+                "password": await credential_service.hash(data.password),
+            }
+        )
+        return await issue_tokens(
+            {**data.model_dump(by_alias=True), "_id": user.inserted_id}, redis
         )
-        return Token(access_token=token, token_type="Bearer")
     except HTTPException as e:
         raise e
     except Exception as e:
         logger.error(f"Error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+async def refresh_access_token(
+    data: RefreshRequest, mongo: AsyncDatabase, redis: Redis
+) -> Token:
+    """Exchange a refresh token for a new access and refresh token.
+
+    The refresh token is consumed, so a stolen token that was already used
+    is worthless, and no password check (bcrypt) is needed.
+
+    Args:
+        data (RefreshRequest): refresh token
+        mongo (AsyncDatabase): mongo database
+        redis (Redis): redis client
+
+    Returns:
+        Token: access and refresh token
+    """
+    try:
+        user_id = await consume_refresh_token(data.refresh_token, redis)
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+        user = await mongo["users"].find_one({"_id": ObjectId(user_id)})
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+        return await issue_tokens(user, redis)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+async def logout(data: LogoutRequest, request: Request, redis: Redis) -> None:
+    """Revoke the access token of the request and the given refresh token.
+
+    Args:
+        data (LogoutRequest): refresh token to invalidate, optional
+        request (Request): request authenticated by ``AuthMiddleware``
+        redis (Redis): redis client
+    """
+    try:
+        if request.state.token_id is not None:
+            await revocation_list.revoke(
+                request.state.token_id, request.state.token_expires, redis
+            )
+        if data.refresh_token:
+            await redis.delete(refresh_key(data.refresh_token))
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
@@ -0,0 +1,104 @@
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import time
+from typing import Any
+from app.config import settings
+from app.src.auth.utils import hash_password, verify_password
+from fastapi import HTTPException
+
+
+def hash_rounds(hashed_password: str | bytes) -> int:
+    """Cost factor of a bcrypt hash, e.g. 12 for ``$2b$12$...``."""
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode("utf-8")
+    return int(hashed_password.split(b"$")[2])
+
+
+class CredentialService:
+    """Hashes and verifies passwords in a dedicated process pool.
+
+    bcrypt is pure CPU, ~250 ms per call at the default cost, so running it on
+    the request threads lets a login burst starve every other endpoint. Calls
+    run in ``auth.hash_workers`` processes instead, outside the GIL, with at
+    most as many in flight. Up to ``auth.hash_max_pending`` further calls
+    wait for a worker, beyond that requests fail fast with a 503.
+    """
+
+    def __init__(self) -> None:
+        self._executor: ProcessPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.queue_seconds_total = 0.0
+        self.max_queue_seconds = 0.0
+
+    @property
+    def workers(self) -> int:
+        return settings.auth.hash_workers or multiprocessing.cpu_count()
+
+    async def start(self) -> None:
+        if self._executor is None:
+            # Workers are spawned, forking would copy the event loop's threads
+            self._executor = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            self._slots = asyncio.Semaphore(self.workers)
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+
+    async def _run(self, function: Callable[..., Any], *args: Any) -> Any:
+        await self.start()
+        if self._slots.locked() and self.waiting >= settings.auth.hash_max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many authentication requests, retry later",
+                headers={"Retry-After": "1"},
+            )
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            queue_seconds = time.perf_counter() - queued
+            self.queue_seconds_total += queue_seconds
+            self.max_queue_seconds = max(self.max_queue_seconds, queue_seconds)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, function, *args)
+        finally:
+            self._slots.release()
+            self.completed += 1
+
+    async def hash(self, password: str) -> bytes:
+        """Hash a password with the configured cost factor."""
+        return await self._run(hash_password, password, settings.auth.bcrypt_rounds)
+
+    async def verify(self, password: str, hashed_password: str | bytes) -> bool:
+        return await self._run(verify_password, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str | bytes) -> bool:
+        return hash_rounds(hashed_password) != settings.auth.bcrypt_rounds
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            "workers": self.workers,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "queue_seconds_total": self.queue_seconds_total,
+            "max_queue_seconds": self.max_queue_seconds,
+        }
+
+
+credential_service = CredentialService()
@@ -0,0 +1,140 @@
+from collections import OrderedDict
+import hashlib
+import time
+from app.config import settings
+from app.databases import clients
+from app.src.auth.revocation import revocation_list
+from app.src.auth.utils import verify_jwt_token
+from app.src.users.schemas import User
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from loguru import logger
+from pydantic import ValidationError
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class TokenCache:
+    """LRU of the users named by JWTs, keyed by the token's SHA-256 digest.
+
+    Entries are served until the token's ``exp``, so a cached token is never
+    accepted for longer than ``verify_jwt_token`` would accept it. Only valid
+    tokens are cached, random tokens can not flush the cache.
+    """
+
+    def __init__(self) -> None:
+        # Expiration, user and token ID (``jti``) of each token
+        self._entries: OrderedDict[bytes, tuple[float, User, str | None]] = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> tuple[float, User, str | None] | None:
+        """Expiration, user and ID of a valid token, verified on a cache miss."""
+        key = hashlib.sha256(token.encode()).digest()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.time():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self._entries.pop(key, None)
+        self.misses += 1
+
+        claims = verify_jwt_token(token)
+        if claims is None or "exp" not in claims:
+            return None
+        try:
+            user = User(
+                _id=claims["user_id"],
+                username=claims["username"],
+                first_name=claims["first_name"],
+                last_name=claims["last_name"],
+                email=claims["email"],
+            )
+        except (KeyError, ValidationError):
+            return None
+        entry = self._entries[key] = (claims["exp"], user, claims.get("jti"))
+        while len(self._entries) > settings.auth.token_cache_size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def snapshot(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache()
+
+
+class AuthMiddleware:
+    """Rejects requests without a valid bearer token before routing.
+
+    The user named by the token is set as ``request.state.user``, read it
+    with ``get_current_user`` instead of loading the user from Mongo. Revoked
+    tokens are rejected too, the revocation list answers most checks without
+    a round trip to Redis. Tokens issued without an ID can not be revoked.
+    """
+
+    def __init__(self, app: ASGIApp, public_paths: list[str]) -> None:
+        self.app = app
+        self.public_paths = set(public_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in self.public_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        authorization = Request(scope).headers.get("Authorization")
+        if not authorization:
+            response = JSONResponse(
+                status_code=401, content={"detail": "Missing token"}
+            )
+            await response(scope, receive, send)
+            return
+        scheme, _, token = authorization.partition(" ")
+        entry = token_cache.get(token) if scheme.lower() == "bearer" else None
+        if entry is None:
+            response = JSONResponse(
+                status_code=401, content={"detail": "Invalid token"}
+            )
+            await response(scope, receive, send)
+            return
+        expires, user, token_id = entry
+        if token_id is not None:
+            try:
+                revoked = await revocation_list.is_revoked(
+                    token_id, clients.get_redis()
+                )
+            except Exception as e:
+                logger.error(f"Revocation check failed: {e}")
+                response = JSONResponse(
+                    status_code=503,
+                    content={"detail": "Authentication unavailable, retry later"},
+                    headers={"Retry-After": "1"},
+                )
+                await response(scope, receive, send)
+                return
+            if revoked:
+                response = JSONResponse(
+                    status_code=401, content={"detail": "Token revoked"}
+                )
+                await response(scope, receive, send)
+                return
+
+        state = scope.setdefault("state", {})
+        state["user"] = user
+        # Needed to revoke the token on logout
+        state["token_id"] = token_id
+        state["token_expires"] = expires
+        await self.app(scope, receive, send)
+
+
+def get_current_user(request: Request) -> User:
+    """Dependency returning the user authenticated by ``AuthMiddleware``."""
+    return request.state.user
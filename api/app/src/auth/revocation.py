@@ -0,0 +1,180 @@
+"""Refresh tokens and the access token denylist.
+
+Refresh tokens are opaque random strings. Only their SHA-256 digest is kept
+in Redis, mapped to the user ID, and each one is consumed when used so that
+a refresh returns a new pair of tokens.
+
+Revoked access tokens are ``auth:revoked:{jti}`` keys expiring with the
+token. Every process mirrors them in a bloom filter, filled from Redis on
+start and kept current through ``REVOKED_CHANNEL``. A token missing from the
+filter is certainly not revoked, so the common request costs no round trip;
+only filter hits, real or false positives, are confirmed in Redis. Entries
+can not be removed from a bloom filter, so it is rebuilt every
+``auth.access_token_minutes`` to drop expired tokens.
+"""
+
+import asyncio
+import hashlib
+import math
+import secrets
+import time
+from app.config import settings
+from app.databases import clients
+from loguru import logger
+from redis.asyncio import Redis
+
+REVOKED_CHANNEL = "auth:revoked"
+
+
+def revoked_key(jti: str) -> str:
+    return f"auth:revoked:{jti}"
+
+
+def refresh_key(refresh_token: str) -> str:
+    return f"auth:refresh:{hashlib.sha256(refresh_token.encode()).hexdigest()}"
+
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+        self.count = 0
+
+    def _positions(self, item: str) -> list[int]:
+        # Double hashing, k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8])
+        second = int.from_bytes(digest[8:]) | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+def new_bloom_filter() -> BloomFilter:
+    return BloomFilter(settings.auth.bloom_capacity, settings.auth.bloom_error_rate)
+
+
+class RevocationList:
+    """Per-process bloom filter in front of the Redis denylist."""
+
+    def __init__(self) -> None:
+        self._bloom = new_bloom_filter()
+        # Filter being rebuilt, revocations received meanwhile go to both
+        self._building: BloomFilter | None = None
+        # Until the filter is loaded every check goes to Redis
+        self._ready = False
+        self._task: asyncio.Task | None = None
+        self.local_checks = 0
+        self.redis_checks = 0
+        self.revoked_hits = 0
+
+    def _add(self, jti: str) -> None:
+        # Own revocations come back through the channel
+        if jti not in self._bloom:
+            self._bloom.add(jti)
+        if self._building is not None:
+            self._building.add(jti)
+
+    async def is_revoked(self, jti: str, redis: Redis) -> bool:
+        if self._ready and jti not in self._bloom:
+            self.local_checks += 1
+            return False
+        self.redis_checks += 1
+        revoked = bool(await redis.exists(revoked_key(jti)))
+        if revoked:
+            self.revoked_hits += 1
+        return revoked
+
+    async def revoke(self, jti: str, expires: float, redis: Redis) -> None:
+        """Deny an access token until it expires, in every process."""
+        self._add(jti)
+        ttl = max(math.ceil(expires - time.time()), 1)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.set(revoked_key(jti), 1, ex=ttl)
+            pipe.publish(REVOKED_CHANNEL, jti)
+            await pipe.execute()
+
+    async def rebuild(self, redis: Redis) -> None:
+        """Refill the filter from Redis, dropping expired revocations."""
+        self._building = new_bloom_filter()
+        try:
+            async for key in redis.scan_iter(match=revoked_key("*"), count=1000):
+                self._building.add(key.removeprefix(revoked_key("")))
+            self._bloom = self._building
+            self._ready = True
+        finally:
+            self._building = None
+        logger.debug("Loaded {} revoked tokens", self._bloom.count)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _listen(self) -> None:
+        interval = settings.auth.access_token_minutes * 60
+        while True:
+            try:
+                redis = clients.get_redis()
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(REVOKED_CHANNEL)
+                    # Anything published while not subscribed was missed
+                    await self.rebuild(redis)
+                    rebuilt = time.monotonic()
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=5
+                        )
+                        if message and message["type"] == "message":
+                            self._add(message["data"])
+                        if time.monotonic() - rebuilt > interval:
+                            await self.rebuild(redis)
+                            rebuilt = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Revocation listener error: {e}")
+                self._ready = False
+                await asyncio.sleep(1)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "revoked_tokens": self._bloom.count,
+            "local_checks": self.local_checks,
+            "redis_checks": self.redis_checks,
+            "revoked_hits": self.revoked_hits,
+        }
+
+
+revocation_list = RevocationList()
+
+
+async def create_refresh_token(user_id: str, redis: Redis) -> str:
+    refresh_token = secrets.token_urlsafe(32)
+    await redis.set(
+        refresh_key(refresh_token),
+        user_id,
+        ex=settings.auth.refresh_token_days * 86_400,
+    )
+    return refresh_token
+
+
+async def consume_refresh_token(refresh_token: str, redis: Redis) -> str | None:
+    """User ID of a refresh token, which can not be used again."""
+    return await redis.getdel(refresh_key(refresh_token))
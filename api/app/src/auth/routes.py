@@ -1,26 +1,70 @@
-from app.databases import get_mongo_client
-from app.src.auth.controllers import get_access_token, register_user
+from app.databases import get_mongo_client, get_redis_client
+from app.src.auth.controllers import (
+    get_access_token,
+    logout,
+    refresh_access_token,
+    register_user,
+)
 from typing import Annotated
-from app.src.auth.schemas import Token
-from app.src.users.schemas import UserCreate
-from fastapi import APIRouter, Depends
-from fastapi.security import OAuth2PasswordRequestForm
+from app.src.auth.middleware import get_current_user
+from app.src.auth.schemas import LogoutRequest, RefreshRequest, Token
+from app.src.users.schemas import User, UserCreate
+from fastapi import APIRouter, Depends, Request, Security
+from fastapi.security import APIKeyHeader, OAuth2PasswordRequestForm
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/login", response_model=Token, summary="Login for access token")
-def login_for_access_token(
+async def login_for_access_token(
     data: Annotated[OAuth2PasswordRequestForm, Depends()],
     mongo: Annotated[get_mongo_client, Depends()],
+    redis: Annotated[get_redis_client, Depends()],
 ) -> Token:
-    return get_access_token(data=data, mongo=mongo)
+    return await get_access_token(data=data, mongo=mongo, redis=redis)
 
 
 @router.post("/register", response_model=Token, summary="Register a new user")
-def endp_register_user(
+async def endp_register_user(
     data: UserCreate,
     mongo: Annotated[get_mongo_client, Depends()],
+    redis: Annotated[get_redis_client, Depends()],
 ) -> Token:
-    return register_user(data=data, mongo=mongo)
\ No newline at end of file
+    return await register_user(data=data, mongo=mongo, redis=redis)
+
+
+@router.post(
+    "/refresh", response_model=Token, summary="Exchange a refresh token for new tokens"
+)
+async def endp_refresh_token(
+    data: RefreshRequest,
+    mongo: Annotated[get_mongo_client, Depends()],
+    redis: Annotated[get_redis_client, Depends()],
+) -> Token:
+    return await refresh_access_token(data=data, mongo=mongo, redis=redis)
+
+
+@router.post(
+    "/logout",
+    summary="Revoke the access token and the refresh token",
+    dependencies=[Security(APIKeyHeader(name="Authorization"))],
+)
+async def endp_logout(
+    data: LogoutRequest,
+    request: Request,
+    redis: Annotated[get_redis_client, Depends()],
+):
+    return await logout(data=data, request=request, redis=redis)
+
+
+@router.get(
+    "/me",
+    response_model=User,
+    summary="Get the user of the access token",
+    dependencies=[Security(APIKeyHeader(name="Authorization"))],
+)
+async def endp_get_current_user(
+    user: Annotated[User, Depends(get_current_user)],
+) -> User:
+    return user
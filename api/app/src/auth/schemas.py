@@ -3,4 +3,16 @@ from pydantic import BaseModel
 
 class Token(BaseModel):
     access_token: str
-    token_type: str
\ No newline at end of file
+    token_type: str
+    refresh_token: str | None = None
+    # Lifetime of the access token in seconds
+    expires_in: int | None = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    # Also invalidate this refresh token, if given
+    refresh_token: str | None = None
\ No newline at end of file
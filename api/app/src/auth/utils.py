@@ -1,7 +1,7 @@
 import bcrypt
-from fastapi import HTTPException
 import jwt
 import datetime
+import uuid
 
 from loguru import logger
 
@@ -10,23 +10,24 @@ from app.config import settings
 
 def generate_jwt_token(
     user_id,
-    username,
     email,
+    username,
     first_name,
     last_name,
     algorithm="HS256",
-    expiration_minutes=30,
+    expiration_minutes=None,
 ) -> str:
     """Generate a JWT token.
 
     Args:
         user_id (_type_): user id
-        username (_type_):  username
         email (_type_): email
+        username (_type_):  username
         first_name (_type_): fisrt_name
         last_name (_type_): last_name
         algorithm (str, optional):algorithm . Defaults to "HS256".
-        expiration_minutes (int): token expiration . Defaults to 30.
+        expiration_minutes (int): token expiration . Defaults to
+            ``auth.access_token_minutes``.
 
     Returns:
         str: JWT token
@@ -37,7 +38,12 @@ def generate_jwt_token(
         "username": username,
         "first_name": first_name,
         "last_name": last_name,
-        "exp": datetime.datetime.now() + datetime.timedelta(minutes=expiration_minutes),
+        "exp": datetime.datetime.now(datetime.UTC)
+        + datetime.timedelta(
+            minutes=expiration_minutes or settings.auth.access_token_minutes
+        ),
+        # Identifies the token on the revocation list
+        "jti": uuid.uuid4().hex,
     }
     token = jwt.encode(payload, settings.app.secret_key, algorithm=algorithm)
     return token
@@ -63,18 +69,18 @@ def verify_jwt_token(token, algorithm="HS256"):
         return None
 
 
-def hash_password(password):
+def hash_password(password, rounds=12):
     """
     Hash the password using bcrypt.
 
+    Runs in the credential service's worker processes, errors are raised as
+    is since an HTTPException can not be sent back from them.
+
     :param password: The password to hash.
+    :param rounds: The bcrypt cost factor.
     :return: The hashed password.
     """
-    try:
-        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
-    except Exception as e:
-        logger.error(f"auth/utils/hash_password | {e}")
-        raise HTTPException(status_code=500, detail="Internal server error") from e
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds))
 
 
 def verify_password(password, hashed_password):
@@ -85,8 +91,6 @@ def verify_password(password, hashed_password):
     :param hashed_password: The hashed password to verify against.
     :return: True if the password is verified, False otherwise.
     """
-    try:
-        return bcrypt.checkpw(password.encode("utf-8"), hashed_password)
-    except Exception as e:
-        logger.error(f"auth/utils/verify_password | {e}")
-        raise HTTPException(status_code=500, detail="Internal server error") from e
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode("utf-8")
+    return bcrypt.checkpw(password.encode("utf-8"), hashed_password)
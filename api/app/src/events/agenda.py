@@ -0,0 +1,185 @@
+"""Per-user agendas materialized in Redis.
+
+``user:{user_id}:agenda`` is a sorted set of the IDs of the events the user
+attends, scored by start time, so an agenda window is a single range read.
+``event:{event_id}:agenda`` lists the users whose agenda holds an event, so
+an update or delete replaces its entries without reading the previous
+attendees from Mongo.
+
+Agendas are built from Mongo on first read. ``user:{user_id}:agenda:built``
+is ``0`` while a build runs, so concurrent writes already land in the agenda,
+and ``1`` once it is complete. Readers re-check the events they load, so an
+entry left behind by a write racing a build is repaired instead of served.
+"""
+
+from datetime import UTC, datetime
+from app.src.events.schemas import Event
+from loguru import logger
+from redis.asyncio import Redis
+
+# Events written per pipeline by ``update_agendas``
+AGENDA_BATCH_SIZE = 1000
+# Seconds a build may take before another reader starts over
+AGENDA_BUILD_TIMEOUT = 60
+
+# KEYS: event users set; ARGV: event id, start time, agenda key prefix, user ids
+# Agendas that were never built are left alone, they are read from Mongo.
+AGENDA_SCRIPT = """
+local previous = redis.call('SMEMBERS', KEYS[1])
+for i = 1, #previous do
+    redis.call('ZREM', ARGV[3] .. previous[i] .. ':agenda', ARGV[1])
+end
+redis.call('DEL', KEYS[1])
+for i = 4, #ARGV do
+    if redis.call('EXISTS', ARGV[3] .. ARGV[i] .. ':agenda:built') == 1 then
+        redis.call('ZADD', ARGV[3] .. ARGV[i] .. ':agenda', ARGV[2], ARGV[1])
+    end
+    redis.call('SADD', KEYS[1], ARGV[i])
+end
+return #ARGV - 3
+"""
+
+# KEYS: built marker, agenda; ARGV: build timeout
+BEGIN_BUILD_SCRIPT = """
+if redis.call('SET', KEYS[1], '0', 'NX', 'EX', ARGV[1]) then
+    redis.call('DEL', KEYS[2])
+    return 1
+end
+return 0
+"""
+
+
+def agenda_key(user_id: str) -> str:
+    return f"user:{user_id}:agenda"
+
+
+def agenda_built_key(user_id: str) -> str:
+    return f"user:{user_id}:agenda:built"
+
+
+def event_agenda_key(event_id: str) -> str:
+    return f"event:{event_id}:agenda"
+
+
+def agenda_score(value: datetime) -> float:
+    """Timestamp of a start time, naive times are UTC as stored by Mongo."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.timestamp()
+
+
+def agenda_args(event_id: str, start: float, user_ids: list[str]) -> tuple:
+    """Arguments of ``AGENDA_SCRIPT``, no users removes the event."""
+    return (1, event_agenda_key(event_id), event_id, start, "user:", *user_ids)
+
+
+async def update_agendas(events: list[Event], redis: Redis) -> None:
+    """Place events in the agendas of their attendees, pipelined per batch.
+
+    Args:
+        events (list[Event]): created or updated events
+        redis (Redis): redis client
+    """
+    try:
+        for start in range(0, len(events), AGENDA_BATCH_SIZE):
+            async with redis.pipeline(transaction=False) as pipe:
+                for event in events[start : start + AGENDA_BATCH_SIZE]:
+                    pipe.eval(
+                        AGENDA_SCRIPT,
+                        *agenda_args(
+                            event.event_id,
+                            agenda_score(event.start_time),
+                            event.attendees,
+                        ),
+                    )
+                await pipe.execute()
+    except Exception as e:
+        # Agendas missing the events are rebuilt on their next read
+        logger.warning(f"Agenda update failed for {len(events)} events: {e}")
+        await reset_agendas(
+            [user_id for event in events for user_id in event.attendees], redis
+        )
+
+
+async def remove_from_agendas(event_id: str, redis: Redis) -> None:
+    """Remove a deleted event from every agenda."""
+    try:
+        await redis.eval(AGENDA_SCRIPT, *agenda_args(event_id, 0, []))
+    except Exception as e:
+        # Readers drop entries of events that no longer exist
+        logger.warning(f"Agenda update failed for event {event_id}: {e}")
+
+
+async def reset_agendas(user_ids: list[str], redis: Redis) -> None:
+    if not user_ids:
+        return
+    try:
+        await redis.delete(*(agenda_built_key(user_id) for user_id in user_ids))
+    except Exception as e:
+        logger.error(f"Agenda reset failed for {len(user_ids)} users: {e}")
+
+
+async def read_agenda(
+    user_id: str, start: float, end: float, redis: Redis
+) -> list[str] | None:
+    """Event IDs of an agenda window, ordered by start time.
+
+    Args:
+        user_id (str): user ID
+        start (float): window start timestamp, inclusive
+        end (float): window end timestamp, exclusive
+        redis (Redis): redis client
+
+    Returns:
+        list[str] | None: event IDs, None when the agenda is not built yet
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.get(agenda_built_key(user_id))
+        pipe.zrangebyscore(agenda_key(user_id), start, f"({end}")
+        built, event_ids = await pipe.execute()
+    return event_ids if built == "1" else None
+
+
+async def begin_agenda_build(user_id: str, redis: Redis) -> bool:
+    """Start rebuilding an agenda, False when another reader is building it.
+
+    Writes made while the agenda is read from Mongo already land in it.
+    """
+    return bool(
+        await redis.eval(
+            BEGIN_BUILD_SCRIPT,
+            2,
+            agenda_built_key(user_id),
+            agenda_key(user_id),
+            AGENDA_BUILD_TIMEOUT,
+        )
+    )
+
+
+async def finish_agenda_build(
+    user_id: str, events: dict[str, float], redis: Redis
+) -> None:
+    """Store an agenda read from Mongo, events mapped to start timestamps."""
+    async with redis.pipeline(transaction=True) as pipe:
+        if events:
+            pipe.zadd(agenda_key(user_id), events)
+        for event_id in events:
+            pipe.sadd(event_agenda_key(event_id), user_id)
+        # Not marked built when the build timed out meanwhile
+        pipe.set(agenda_built_key(user_id), "1", xx=True)
+        await pipe.execute()
+
+
+async def repair_agenda(
+    user_id: str, rescored: dict[str, float], removed: list[str], redis: Redis
+) -> None:
+    """Fix entries left behind by writes that raced an agenda build."""
+    try:
+        async with redis.pipeline(transaction=True) as pipe:
+            if rescored:
+                pipe.zadd(agenda_key(user_id), rescored)
+            if removed:
+                pipe.zrem(agenda_key(user_id), *removed)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Agenda repair failed for user {user_id}: {e}")
@@ -0,0 +1,182 @@
+import hashlib
+import json
+from app.cache import (
+    CacheEntry,
+    CacheLookup,
+    Loader,
+    bump_versions,
+    cache_fill,
+    cache_get,
+    publish_invalidation,
+    read_through,
+    write_model,
+)
+from app.config import settings
+from app.src.events.schemas import Event, EventAttendees
+from app.src.users.cache import user_version_key
+from loguru import logger
+from redis.asyncio import Redis
+
+EVENTS_VERSION_KEY = "events:version"
+
+
+def event_key(event_id: str) -> str:
+    return f"event:{event_id}"
+
+
+def event_users_key(event_id: str) -> str:
+    return f"event:{event_id}:users"
+
+
+def event_version_key(event_id: str) -> str:
+    return f"event:{event_id}:version"
+
+
+def user_events_key(user_id: str) -> str:
+    """Tag set of the events whose cached attendee list contains the user."""
+    return f"user:{user_id}:events"
+
+
+def events_query_key(params: dict) -> str:
+    digest = hashlib.sha1(
+        json.dumps(params, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f"events:query:{digest}"
+
+
+async def read_event(event_id: str, load: Loader, redis: Redis) -> Event:
+    return await read_through(
+        "event", event_key(event_id), event_version_key(event_id), Event, load, redis
+    )
+
+
+async def cache_event(event: Event, lookup: CacheLookup, redis: Redis) -> None:
+    await write_model(
+        event_key(event.event_id),
+        event,
+        settings.cache.event_ttl,
+        {event_version_key(event.event_id): lookup.version},
+        lookup,
+        redis,
+    )
+
+
+async def read_event_users(event_id: str, load: Loader, redis: Redis) -> EventAttendees:
+    return await read_through(
+        "event_users",
+        event_users_key(event_id),
+        event_version_key(event_id),
+        EventAttendees,
+        load,
+        redis,
+    )
+
+
+async def get_user_versions(user_ids: list[str], redis: Redis) -> dict[str, str]:
+    """Versions of the attendees, read before their documents are joined."""
+    if not user_ids:
+        return {}
+    try:
+        versions = await redis.mget([user_version_key(user_id) for user_id in user_ids])
+    except Exception as e:
+        logger.warning(f"Cache read failed for user versions: {e}")
+        return {user_id: "" for user_id in user_ids}
+    return {
+        user_id: version or "0"
+        for user_id, version in zip(user_ids, versions, strict=True)
+    }
+
+
+async def cache_event_users(
+    event: EventAttendees,
+    lookup: CacheLookup,
+    user_versions: dict[str, str],
+    redis: Redis,
+) -> None:
+    if "" in user_versions.values():
+        return
+    await write_model(
+        event_users_key(event.event_id),
+        event,
+        settings.cache.event_users_ttl,
+        {
+            event_version_key(event.event_id): lookup.version,
+            **{
+                user_version_key(user_id): user_version
+                for user_id, user_version in user_versions.items()
+            },
+        },
+        lookup,
+        redis,
+        tags=[user_events_key(user_id) for user_id in user_versions],
+        tag_member=event.event_id,
+    )
+
+
+async def get_cached_events_query(
+    params: dict, redis: Redis
+) -> tuple[CacheEntry | None, str]:
+    return await cache_get(
+        "events_query", events_query_key(params), EVENTS_VERSION_KEY, redis
+    )
+
+
+async def cache_events_query(
+    params: dict, payload: str, version: str, redis: Redis
+) -> None:
+    await cache_fill(
+        events_query_key(params),
+        payload,
+        settings.cache.events_query_ttl,
+        {EVENTS_VERSION_KEY: version},
+        redis,
+    )
+
+
+async def invalidate_events(redis: Redis) -> None:
+    """Invalidate every cached event list, e.g. after an event is created."""
+    await bump_versions(redis, EVENTS_VERSION_KEY)
+
+
+async def invalidate_event(event_id: str, redis: Redis) -> None:
+    """Invalidate one event, its attendee view and every cached event list."""
+    await invalidate_many_events([event_id], redis)
+
+
+async def invalidate_many_events(event_ids: list[str], redis: Redis) -> None:
+    await bump_versions(
+        redis,
+        *(event_version_key(event_id) for event_id in event_ids),
+        EVENTS_VERSION_KEY,
+    )
+    if not event_ids:
+        return
+    await publish_invalidation(
+        redis,
+        *(
+            key
+            for event_id in event_ids
+            for key in (event_key(event_id), event_users_key(event_id))
+        ),
+    )
+
+
+async def invalidate_user_events(user_id: str, redis: Redis) -> None:
+    """Invalidate the cached attendee views that include a changed user.
+
+    Must run after ``invalidate_user`` bumped the user version: a fill that
+    read the user before the write observed the old version and is rejected,
+    and a fill stored after the tag set is read holds fresh data.
+    """
+    try:
+        event_ids = await redis.smembers(user_events_key(user_id))
+    except Exception as e:
+        logger.error(f"Cache invalidation failed for user {user_id}: {e}")
+        return
+    if event_ids:
+        await bump_versions(
+            redis, *(event_version_key(event_id) for event_id in event_ids)
+        )
+        await publish_invalidation(
+            redis, *(event_users_key(event_id) for event_id in event_ids)
+        )
@@ -1,114 +1,389 @@
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import UTC, datetime, timedelta
 import json
+import math
+from typing import Any
+from app.cache import CacheLookup
+from app.config import settings
+from app.pagination import (
+    encode_documents,
+    find_page,
+    paginate,
+    parse_projection,
+    parse_sort,
+)
+from app.src.events.agenda import (
+    agenda_score,
+    begin_agenda_build,
+    finish_agenda_build,
+    read_agenda,
+    remove_from_agendas,
+    repair_agenda,
+    update_agendas,
+)
+from app.src.events.freebusy import (
+    busy_intervals,
+    free_slots,
+    freebusy_index,
+    from_score,
+    remove_from_freebusy,
+    update_freebusy,
+)
+from app.src.events.cache import (
+    cache_event,
+    cache_event_users,
+    cache_events_query,
+    get_cached_events_query,
+    get_user_versions,
+    invalidate_event,
+    invalidate_events,
+    invalidate_many_events,
+    read_event,
+    read_event_users,
+)
+from app.src.users.controllers import get_users_by_ids
 from app.src.users.schemas import UserCreator
+from app.src.websockets.reminder_store import (
+    cancel_reminders,
+    schedule_many_reminders,
+    schedule_reminders,
+)
 from bson import ObjectId
 from fastapi import HTTPException
 from loguru import logger
-from pymongo import MongoClient
+from pydantic import ValidationError
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.cursor import AsyncCursor
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from pymongo.results import InsertOneResult
-from pymongo.synchronous.collection import Collection
-from pymongo.synchronous.cursor import Cursor
-from app.src.events.schemas import Event, EventAttendees, EventCreate, EventUpdate
-from redis import Redis
+from app.src.events.schemas import (
+    BulkImportResult,
+    BulkItemResult,
+    Conflict,
+    ConflictCheck,
+    Event,
+    EventAttendees,
+    EventBulkItem,
+    EventCreate,
+    EventUpdate,
+    FreeBusy,
+    FreeSlotQuery,
+    TimeSlot,
+    naive_utc,
+)
+from redis.asyncio import Redis
+
+EVENT_FIELDS = {
+    "title",
+    "start_time",
+    "end_time",
+    "description",
+    "creator",
+    "attendees",
+    "reminders",
+}
+EVENT_SORT_FIELDS = {"title": str, "start_time": datetime, "end_time": datetime}
+FREEBUSY_DEFAULT_WINDOW = timedelta(days=7)
+DUPLICATE_KEY_ERROR = 11000
+
+
+def narrow_range(query: dict, field: str, operator: str, value: datetime) -> None:
+    """Add a ``$lt``/``$gt`` bound to a field, keeping the tighter one."""
+    bounds: dict = query.setdefault(field, {})
+    if operator not in bounds:
+        bounds[operator] = value
+    elif operator == "$lt":
+        bounds[operator] = min(bounds[operator], value)
+    else:
+        bounds[operator] = max(bounds[operator], value)
+
+
+def build_time_filter(
+    now: datetime,
+    include_pass_event: bool = False,
+    include_upcoming_event: bool = False,
+    include_current_event: bool = False,
+    time_from: datetime | None = None,
+    time_to: datetime | None = None,
+) -> dict:
+    """Plan the time conditions of ``get_events`` as index friendly ranges.
+
+    Past events end before ``now``, upcoming ones start after it and current
+    ones are in progress. Adjacent buckets are merged into a single range on
+    ``start_time`` or ``end_time`` (an event always starts before it ends), so
+    only the past plus upcoming combination needs an ``$or``. Events starting
+    or ending exactly at ``now`` belong to no bucket and are excluded with
+    ``$ne``, which the index bounds handle.
 
+    Args:
+        now (datetime): reference time, shared by every condition
+        include_pass_event (bool): include events that already ended
+        include_upcoming_event (bool): include events that have not started yet
+        include_current_event (bool): include events in progress
+        time_from (datetime | None): only events still running at this time
+        time_to (datetime | None): only events starting before this time
+
+    Returns:
+        dict: mongo query
+    """
+    query: dict = {}
+    match include_pass_event, include_current_event, include_upcoming_event:
+        case (True, False, False):
+            narrow_range(query, "end_time", "$lt", now)
+        case (False, False, True):
+            narrow_range(query, "start_time", "$gt", now)
+        case (False, True, False):
+            narrow_range(query, "start_time", "$lt", now)
+            narrow_range(query, "end_time", "$gt", now)
+        case (True, True, False):
+            narrow_range(query, "start_time", "$lt", now)
+            query["end_time"] = {"$ne": now}
+        case (False, True, True):
+            narrow_range(query, "end_time", "$gt", now)
+            query["start_time"] = {"$ne": now}
+        case (True, False, True):
+            query["$or"] = [
+                {"end_time": {"$lt": now}},
+                {"start_time": {"$gt": now}},
+            ]
+        case (True, True, True):
+            query["start_time"] = {"$ne": now}
+            query["end_time"] = {"$ne": now}
+
+    # Window [time_from, time_to): events overlapping it
+    if time_from is not None:
+        narrow_range(query, "end_time", "$gt", time_from)
+    if time_to is not None:
+        narrow_range(query, "start_time", "$lt", time_to)
+    return query
+
+
+def build_events_query(
+    include_pass_event: bool = False,
+    include_upcoming_event: bool = False,
+    include_current_event: bool = False,
+    attend: list | None = None,
+    time_from: datetime | None = None,
+    time_to: datetime | None = None,
+    now: datetime | None = None,
+) -> dict:
+    """Build the Mongo filter used by ``get_events``.
 
-def get_events(
-    mongo: MongoClient,
+    Args:
+        include_pass_event (bool): include events that already ended
+        include_upcoming_event (bool): include events that have not started yet
+        include_current_event (bool): include events in progress
+        attend (list | None): user IDs of which at least one must attend
+        time_from (datetime | None): only events ending after this time
+        time_to (datetime | None): only events starting before this time
+        now (datetime | None): reference time of the filters, current time
+            when None
+
+    Returns:
+        dict: mongo query
+    """
+    # Stored times are naive UTC, as for the agenda and free/busy queries
+    time_from, time_to = (
+        naive_utc(value) if value else value for value in (time_from, time_to)
+    )
+    if time_from is not None and time_to is not None and time_from >= time_to:
+        raise HTTPException(status_code=400, detail="from must be before to")
+
+    query = build_time_filter(
+        now or datetime.now(UTC).replace(tzinfo=None),
+        include_pass_event=include_pass_event,
+        include_upcoming_event=include_upcoming_event,
+        include_current_event=include_current_event,
+        time_from=time_from,
+        time_to=time_to,
+    )
+
+    # Add attendance filter if provided
+    if attend and len(attend) > 0:
+        query["attendees"] = {"$in": [ObjectId(attendee) for attendee in attend]}
+
+    return query
+
+
+async def get_events(
+    mongo: AsyncDatabase,
     redis: Redis,
     include_pass_event: bool = False,
     include_upcoming_event: bool = False,
     include_current_event: bool = False,
     attend: list | None = None,
-) -> list[Event]:
+    after: str | None = None,
+    limit: int | None = None,
+    sort: str | None = None,
+    fields: str | None = None,
+    time_from: datetime | None = None,
+    time_to: datetime | None = None,
+) -> tuple[list[Event] | list[dict], str | None]:
+    """Get a page of events.
+
+    Args:
+        mongo (AsyncDatabase): mongo database
+        redis (Redis): redis client
+        include_pass_event (bool): include events that already ended
+        include_upcoming_event (bool): include events that have not started yet
+        include_current_event (bool): include events in progress
+        attend (list | None): user IDs of which at least one must attend
+        after (str | None): cursor returned with the previous page
+        limit (int | None): page size, all events when None
+        sort (str | None): field to sort by, ``-`` prefix for descending
+        fields (str | None): comma separated fields to return
+        time_from (datetime | None): only events ending after this time
+        time_to (datetime | None): only events starting before this time
+
+    Returns:
+        tuple[list[Event] | list[dict], str | None]: events, partial events
+            when ``fields`` is given, and the cursor of the next page
+    """
     try:
-        # event_keys = redis.keys("event:*")
-        # if event_keys:
-        #     events_data = [json.loads(redis.get(key)) for key in event_keys]
-        #     events_data = [
-        #         {
-        #             "event_id": str(event.get("event_id")),  # Use .get to avoid KeyError  # noqa: E501
-        #             "creator": str(event.get("creator")), # Convert creator to string
-        #             **event
-        #         }
-        #         for event in events_data
-        #     ]
-        #     return [Event(**event) for event in events_data]
-
-        collection: Collection = mongo["events"]
-
-        # Initialize the query dictionary
-        query = {}
-
-        # Add attendance filter if provided
-        if attend and len(attend) > 0:
-            query["attendees"] = {"$in": [ObjectId(attendee) for attendee in attend]}
-
-        # Build time-based conditions
-        time_conditions = []
-
-        if include_pass_event:
-            time_conditions.append({"end_time": {"$lt": datetime.now()}})
-
-        if include_upcoming_event:
-            time_conditions.append({"start_time": {"$gt": datetime.now()}})
-
-        if include_current_event:
-            time_conditions.append(
-                {
-                    "$and": [
-                        {"start_time": {"$lt": datetime.now()}},
-                        {"end_time": {"$gt": datetime.now()}},
-                    ]
-                }
-            )
+        params = {
+            "include_pass_event": include_pass_event,
+            "include_upcoming_event": include_upcoming_event,
+            "include_current_event": include_current_event,
+            "attend": sorted(attend) if attend else None,
+            "after": after,
+            "limit": limit,
+            "sort": sort,
+            "fields": fields,
+            "time_from": time_from,
+            "time_to": time_to,
+        }
+        cached, version = await get_cached_events_query(params, redis)
+        if cached and cached.fresh:
+            page = json.loads(cached.payload)
+            events = page["events"]
+            if fields is None:
+                events = [Event(**event) for event in events]
+            return events, page["next_cursor"]
+
+        collection: AsyncCollection = mongo["events"]
+
+        query: dict = build_events_query(
+            include_pass_event=include_pass_event,
+            include_upcoming_event=include_upcoming_event,
+            include_current_event=include_current_event,
+            attend=attend,
+            time_from=time_from,
+            time_to=time_to,
+        )
 
-        # Combine time conditions with OR if multiple conditions exist
-        if time_conditions:
-            query["$or"] = time_conditions
+        sort_field, direction, sort_type = parse_sort(sort, EVENT_SORT_FIELDS)
+        projection = parse_projection(fields, EVENT_FIELDS)
 
         # Execute the query
-        events: Cursor = collection.find(query)
+        events, next_cursor = await paginate(
+            collection,
+            query,
+            sort_field=sort_field,
+            direction=direction,
+            after=after,
+            limit=limit,
+            sort_type=sort_type,
+            projection=projection,
+        )
+        if projection is not None:
+            events_list = encode_documents(events)
+            payload = events_list
+        else:
+            events_list = [Event(**event) for event in events]
+            payload = [
+                event.model_dump(mode="json", by_alias=True) for event in events_list
+            ]
+
+        await cache_events_query(
+            params,
+            json.dumps({"events": payload, "next_cursor": next_cursor}),
+            version,
+            redis,
+        )
+        return events_list, next_cursor
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
 
-        events_list: list[Event] = [Event(**event) for event in events]
 
-        # for event in events_list:
-        #     event_key = f"event:{event.event_id}"
-        #     redis.set(event_key, event.model_dump_json(), ex=3600)
+def find_events(
+    mongo: AsyncDatabase,
+    include_pass_event: bool = False,
+    include_upcoming_event: bool = False,
+    include_current_event: bool = False,
+    attend: list | None = None,
+    after: str | None = None,
+    limit: int | None = None,
+    sort: str | None = None,
+    fields: str | None = None,
+    time_from: datetime | None = None,
+    time_to: datetime | None = None,
+) -> AsyncCursor:
+    """Get a cursor over events for streaming, see ``get_events`` for arguments.
 
-        return events_list
+    Returns:
+        AsyncCursor: cursor over raw event documents
+    """
+    try:
+        sort_field, direction, sort_type = parse_sort(sort, EVENT_SORT_FIELDS)
+        return find_page(
+            mongo["events"],
+            build_events_query(
+                include_pass_event=include_pass_event,
+                include_upcoming_event=include_upcoming_event,
+                include_current_event=include_current_event,
+                attend=attend,
+                time_from=time_from,
+                time_to=time_to,
+            ),
+            sort_field=sort_field,
+            direction=direction,
+            after=after,
+            limit=limit,
+            sort_type=sort_type,
+            projection=parse_projection(fields, EVENT_FIELDS),
+        )
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(f"Error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
-def get_event(event_id: str, mongo: MongoClient, redis: Redis) -> Event:
+async def load_event(
+    event_id: str, lookup: CacheLookup, mongo: AsyncDatabase, redis: Redis
+) -> Event:
+    """Read an event from Mongo and cache it, see ``read_through``."""
+    collection: AsyncCollection = mongo["events"]
+    event: dict | None = await collection.find_one({"_id": ObjectId(event_id)})
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    res = Event(**event)
+
+    await cache_event(res, lookup, redis)
+    return res
+
+
+async def get_event(event_id: str, mongo: AsyncDatabase, redis: Redis) -> Event:
     """Get event by ID.
 
     Args:
         event_id (str): Event ID
-        mongo (MongoClient): mongo client
+        mongo (AsyncDatabase): mongo database
 
     Returns:
         Event: pydantic model for event
     """
     try:
-        # Check if event exists in Redis
-        # event_data = redis.get(f"event:{event_id}")
-        # if event_data:
-        #     res = json.loads(event_data)
-        #     res["event_id"] = str(res["event_id"])
-        #     return Event(**res)
-
-        collection: Collection = mongo["events"]
-        event: dict | None = collection.find_one({"_id": ObjectId(event_id)})
-        if not event:
-            raise HTTPException(status_code=404, detail="Event not found")
-        res = Event(**event)
-
-        # event_key = f"event:{res.event_id}"  # Assuming Event has an id field
-        # redis.set(event_key, res.model_dump_json(), ex=3600)  # Cache for 1 hour
-
-        return res
+        return await read_event(
+            event_id,
+            lambda lookup: load_event(event_id, lookup, mongo, redis),
+            redis,
+        )
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -116,89 +391,276 @@ def get_event(event_id: str, mongo: MongoClient, redis: Redis) -> Event:
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
-def get_event_users(event_id: str, mongo: MongoClient, redis: Redis) -> Event:
+async def load_event_users(
+    event_id: str, lookup: CacheLookup, mongo: AsyncDatabase, redis: Redis
+) -> EventAttendees:
+    """Join an event with its attendees and cache it, see ``read_through``.
+
+    Attendees come from the user cache, so only uncached users are queried.
+    """
+    collection: AsyncCollection = mongo["events"]
+    event: dict | None = await collection.find_one({"_id": ObjectId(event_id)})
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    # Observed before the join, so a concurrent profile change rejects the fill
+    user_versions = await get_user_versions(
+        [str(attendee) for attendee in event["attendees"]], redis
+    )
+    users = await get_users_by_ids(list(user_versions), mongo, redis)
+    attendees: list[UserCreator] = [
+        UserCreator(
+            **users[attendee].model_dump(),
+            creator=attendee == str(event["creator"]),
+        )
+        for attendee in user_versions
+        if attendee in users
+    ]
+    # Built from the document so the "_id" alias fills event_id
+    res = EventAttendees(**{**event, "attendees": attendees})
+    await cache_event_users(res, lookup, user_versions, redis)
+    return res
+
+
+async def get_event_users(event_id: str, mongo: AsyncDatabase, redis: Redis) -> Event:
     """Get event by ID joined with users.
 
+    Concurrent requests for an uncached event share a single aggregation.
+
     Args:
         event_id (str): Event ID
-        mongo (MongoClient): mongo client
+        mongo (AsyncDatabase): mongo database
 
     Returns:
         Event: pydantic model for event
     """
     try:
-        cache_key = f"event:{event_id}"
-        cached_event = redis.get(cache_key)
-
-        if cached_event:
-            # If cached, parse and return the cached event data
-            event_data = json.loads(cached_event)
-            # for att in event_data["attendees"]:
-            #     logger.info(
-            #         UserCreator(
-            #             creator=att["creator"],
-            #             id=str(att["id"]),
-            #             username=att["username"],
-            #             first_name=att["first_name"],
-            #             last_name=att["last_name"],
-            #             email=att["email"],
-                        
-            #         )
-            #     )
-            attendees = [UserCreator(**att) for att in event_data["attendees"]]
-            return EventAttendees(
-                event_id=event_data["event_id"],
-                title=event_data["title"],
-                start_time=event_data["start_time"],
-                end_time=event_data["end_time"],
-                description=event_data["description"],
-                creator=event_data["creator"],
-                attendees=attendees,
-                reminders=event_data["reminders"],
-            )
-
-        collection: Collection = mongo["events"]
         if not ObjectId.is_valid(event_id):
             raise HTTPException(status_code=400, detail="Invalid event ID")
-        event: dict | None = collection.find_one({"_id": ObjectId(event_id)})
-        if not event:
-            raise HTTPException(status_code=404, detail="Event not found")
-        pipeline = [
-            {"$match": {"_id": ObjectId(event_id)}},
-            {
-                "$lookup": {
-                    "from": "users",
-                    "localField": "attendees",
-                    "foreignField": "_id",
-                    "as": "attendees",
-                }
-            },
+        return await read_event_users(
+            event_id,
+            lambda lookup: load_event_users(event_id, lookup, mongo, redis),
+            redis,
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+async def load_agenda_events(
+    user_id: str, start: float, end: float, mongo: AsyncDatabase, redis: Redis
+) -> tuple[list[dict], list[str] | None]:
+    """Read the agenda window, building the agenda when it is missing.
+
+    Returns:
+        tuple[list[dict], list[str] | None]: event documents, possibly outside
+            the window, and the agenda entries when they were read from it
+    """
+    collection: AsyncCollection = mongo["events"]
+    event_ids = await read_agenda(user_id, start, end, redis)
+    if event_ids is not None:
+        query = {"_id": {"$in": [ObjectId(event_id) for event_id in event_ids]}}
+        return await collection.find(query).to_list(), event_ids
+
+    query: dict = {"attendees": ObjectId(user_id)}
+    if not await begin_agenda_build(user_id, redis):
+        # Another request is building the agenda, read the window directly
+        window = {
+            operator: datetime.fromtimestamp(bound, UTC).replace(tzinfo=None)
+            for operator, bound in (("$gte", start), ("$lt", end))
+            if math.isfinite(bound)
+        }
+        if window:
+            query["start_time"] = window
+        return await collection.find(query).to_list(), None
+
+    events = await collection.find(query).to_list()
+    await finish_agenda_build(
+        user_id,
+        {str(event["_id"]): agenda_score(event["start_time"]) for event in events},
+        redis,
+    )
+    return events, None
+
+
+async def get_user_agenda(
+    user_id: str,
+    mongo: AsyncDatabase,
+    redis: Redis,
+    time_from: datetime | None = None,
+    time_to: datetime | None = None,
+) -> list[Event]:
+    """Get the events a user attends starting within a window.
+
+    Event IDs come from the user's agenda in Redis, a single range read,
+    see ``app.src.events.agenda``.
+
+    Args:
+        user_id (str): user ID
+        mongo (AsyncDatabase): mongo database
+        redis (Redis): redis client
+        time_from (datetime | None): only events starting at or after this time
+        time_to (datetime | None): only events starting before this time
+
+    Returns:
+        list[Event]: events ordered by start time
+    """
+    try:
+        if not ObjectId.is_valid(user_id):
+            raise HTTPException(status_code=400, detail="Invalid user ID")
+        start = agenda_score(time_from) if time_from else float("-inf")
+        end = agenda_score(time_to) if time_to else float("inf")
+        if start >= end:
+            raise HTTPException(status_code=400, detail="from must be before to")
+
+        events, event_ids = await load_agenda_events(user_id, start, end, mongo, redis)
+
+        agenda: list[Event] = []
+        rescored: dict[str, float] = {}
+        removed = set(event_ids or ())
+        for event in (Event(**event) for event in events):
+            if user_id not in event.attendees:
+                continue
+            removed.discard(event.event_id)
+            score = agenda_score(event.start_time)
+            if start <= score < end:
+                agenda.append(event)
+            elif event_ids is not None:
+                rescored[event.event_id] = score
+        # Entries written by a change racing an agenda build are fixed here
+        if rescored or removed:
+            await repair_agenda(user_id, rescored, list(removed), redis)
+
+        return sorted(
+            agenda, key=lambda event: (agenda_score(event.start_time), event.event_id)
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+def parse_user_ids(user_ids: list[str]) -> list[str]:
+    """Reject invalid user IDs, dropping duplicates."""
+    invalid = [user_id for user_id in user_ids if not ObjectId.is_valid(user_id)]
+    if invalid:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid user IDs: {', '.join(invalid)}"
+        )
+    return list(dict.fromkeys(user_ids))
+
+
+def parse_window(start_time: datetime, end_time: datetime) -> tuple[float, float]:
+    start, end = agenda_score(start_time), agenda_score(end_time)
+    if start >= end:
+        raise HTTPException(
+            status_code=400, detail="start_time must be before end_time"
+        )
+    return start, end
+
+
+async def check_conflicts(data: ConflictCheck, mongo: AsyncDatabase) -> list[Conflict]:
+    """Find the events of the attendees that overlap a time window.
+
+    Args:
+        data (ConflictCheck): attendees and window, e.g. of an event being
+            created or edited
+        mongo (AsyncDatabase): mongo database
+
+    Returns:
+        list[Conflict]: overlapping events per attendee, ordered by start time
+    """
+    try:
+        user_ids = parse_user_ids(data.attendees)
+        start, end = parse_window(data.start_time, data.end_time)
+        timelines = await freebusy_index.timelines(user_ids, mongo)
+        conflicts = [
+            (event_start, user_id, event_end, event_id)
+            for user_id in user_ids
+            for event_start, event_end, event_id in timelines[user_id].overlapping(
+                start, end
+            )
+            if event_id != data.event_id
         ]
-        collection = list(collection.aggregate(pipeline))
-        if not collection:
-            raise HTTPException(status_code=404, detail="Event not found")
-        attendees: list[UserCreator] = [
-            UserCreator(
-                **att,
-                creator=True
-                if ObjectId(att["_id"]) == ObjectId(collection[0]["creator"])
-                else False,
-                id=str(att["_id"]),
+        return [
+            Conflict(
+                user_id=user_id,
+                event_id=event_id,
+                start_time=from_score(event_start),
+                end_time=from_score(event_end),
             )
-            for att in collection[0]["attendees"]
+            for event_start, user_id, event_end, event_id in sorted(conflicts)
+        ]
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+async def find_free_slots(data: FreeSlotQuery, mongo: AsyncDatabase) -> list[TimeSlot]:
+    """Find time slots in which every attendee is free.
+
+    Args:
+        data (FreeSlotQuery): attendees, window and slot length
+        mongo (AsyncDatabase): mongo database
+
+    Returns:
+        list[TimeSlot]: free gaps at least ``duration`` long, by start time
+    """
+    try:
+        user_ids = parse_user_ids(data.attendees)
+        start, end = parse_window(data.start_time, data.end_time)
+        timelines = await freebusy_index.timelines(user_ids, mongo)
+        slots = free_slots(
+            list(timelines.values()), start, end, data.duration * 60, data.limit
+        )
+        return [
+            TimeSlot(start_time=from_score(slot_start), end_time=from_score(slot_end))
+            for slot_start, slot_end in slots
         ]
-        res = EventAttendees(
-            event_id=collection[0]["_id"],
-            title=collection[0]["title"],
-            start_time=collection[0]["start_time"],
-            end_time=collection[0]["end_time"],
-            description=collection[0]["description"],
-            creator=collection[0]["creator"],
-            attendees=attendees,
-            reminders=collection[0]["reminders"],
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+async def get_user_freebusy(
+    user_id: str,
+    mongo: AsyncDatabase,
+    time_from: datetime | None = None,
+    time_to: datetime | None = None,
+) -> FreeBusy:
+    """Get the merged busy periods of a user.
+
+    Args:
+        user_id (str): user ID
+        mongo (AsyncDatabase): mongo database
+        time_from (datetime | None): window start, now when None
+        time_to (datetime | None): window end, a week after the start when None
+
+    Returns:
+        FreeBusy: busy periods clipped to the window
+    """
+    try:
+        (user_id,) = parse_user_ids([user_id])
+        time_from = time_from or datetime.now(UTC)
+        start, end = parse_window(
+            time_from, time_to or time_from + FREEBUSY_DEFAULT_WINDOW
+        )
+        timeline = (await freebusy_index.timelines([user_id], mongo))[user_id]
+        return FreeBusy(
+            user_id=user_id,
+            busy=[
+                TimeSlot(
+                    start_time=from_score(busy_start), end_time=from_score(busy_end)
+                )
+                for busy_start, busy_end in busy_intervals(timeline, start, end)
+            ],
         )
-        redis.set(cache_key, res.model_dump_json(), ex=360)
-        return res
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -206,57 +668,70 @@ def get_event_users(event_id: str, mongo: MongoClient, redis: Redis) -> Event:
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
-def create_event(data: EventCreate, mongo: MongoClient, redis: Redis) -> Event:
+async def validate_event_users(
+    creator: str, attendees: list[str], mongo: AsyncDatabase
+) -> list[ObjectId]:
+    """Check the creator and attendees exist with a single query.
+
+    Args:
+        creator (str): creator user ID
+        attendees (list[str]): attendee user IDs
+        mongo (AsyncDatabase): mongo database
+
+    Returns:
+        list[ObjectId]: attendee IDs without duplicates, the creator included
+    """
+    if not ObjectId.is_valid(creator):
+        raise HTTPException(status_code=400, detail="Invalid creator ID")
+    if not all(ObjectId.is_valid(attendee) for attendee in attendees):
+        raise HTTPException(status_code=400, detail="Invalid attendee ID")
+
+    creator_id = ObjectId(creator)
+    user_ids = list(dict.fromkeys([*map(ObjectId, attendees), creator_id]))
+    found = {
+        user["_id"]
+        for user in await mongo["users"]
+        .find({"_id": {"$in": user_ids}}, {"_id": 1})
+        .to_list()
+    }
+    if creator_id not in found:
+        raise HTTPException(status_code=404, detail="Creator not found")
+    missing = [str(user_id) for user_id in user_ids if user_id not in found]
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Attendees not found: {', '.join(missing)}"
+        )
+    return user_ids
+
+
+async def create_event(data: EventCreate, mongo: AsyncDatabase, redis: Redis) -> Event:
     """Create a new event.
 
     Args:
         data (EventCreate): data to create event
-        mongo (MongoClient): mongo client
+        mongo (AsyncDatabase): mongo database
 
     Returns:
         Event: pydantic model for event
     """
     try:
-        # Validate creator and attendees
-        if not ObjectId.is_valid(data.creator):
-            raise HTTPException(status_code=400, detail="Invalid creator ID")
-
-        for attendee in data.attendees:
-            if not ObjectId.is_valid(attendee):
-                raise HTTPException(status_code=400, detail="Invalid attendee ID")
-        # Check if creator and attendees exist
-        if mongo["users"].find_one({"_id": ObjectId(data.creator)}) is None:
-            raise HTTPException(status_code=404, detail="Creator not found")
-        if not all(
-            mongo["users"].find_one({"_id": ObjectId(attendee)})
-            for attendee in data.attendees
-        ):
-            raise HTTPException(status_code=404, detail="Attendee not found")
-        # Insert event into database
-        collection: Collection = mongo["events"]
-
-        if data.creator not in data.attendees:
-            data.attendees.append(data.creator)
-
-        data.attendees = [ObjectId(attendee) for attendee in data.attendees]
-        if collection.find_one({"title": data.title}):
+        data.attendees = await validate_event_users(data.creator, data.attendees, mongo)
+        collection: AsyncCollection = mongo["events"]
+
+        # Titles are unique, enforced by the "title_unique" index
+        event = data.model_dump()
+        try:
+            result: InsertOneResult = await collection.insert_one(event)
+        except DuplicateKeyError as e:
             raise HTTPException(
                 status_code=409, detail="Event with title already exists"
-            )
-
-        event: InsertOneResult = collection.insert_one(data.model_dump())
+            ) from e
+        res = Event(**{**event, "_id": result.inserted_id})
 
-        res = Event(**collection.find_one({"_id": event.inserted_id}))
-
-        for rem in res.reminders:
-            reminder_time: datetime = res.start_time - timedelta(
-                minutes=rem.reminder_time
-            )
-            if reminder_time > datetime.now():
-                redis.zadd(
-                    f"event_r:{res.event_id}:reminders",
-                    {res.title: reminder_time.timestamp()},
-                )
+        await schedule_reminders(res, redis)
+        await update_agendas([res], redis)
+        await update_freebusy([res], redis)
+        await invalidate_events(redis)
 
         return res
     except HTTPException as e:
@@ -266,60 +741,226 @@ def create_event(data: EventCreate, mongo: MongoClient, redis: Redis) -> Event:
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
-def update_event(
-    event_id: str, data: EventUpdate, mongo: MongoClient, redis: Redis
+async def update_event(
+    event_id: str, data: EventUpdate, mongo: AsyncDatabase, redis: Redis
 ) -> Event:
     try:
-        # Validate creator and attendees
-        if not ObjectId.is_valid(data.creator):
-            raise HTTPException(status_code=500, detail="Invalid creator ID")
-        if data.attendees:
-            for attendee in data.attendees:
-                if not ObjectId.is_valid(attendee):
-                    raise HTTPException(status_code=500, detail="Invalid attendee ID")
-        # Check if creator and attendees exist
-        if mongo["users"].find_one({"_id": ObjectId(data.creator)}) is None:
-            raise HTTPException(status_code=404, detail="Creator not found")
-        if not all(
-            mongo["users"].find_one({"_id": ObjectId(attendee)})
-            for attendee in data.attendees
-        ):
-            raise HTTPException(status_code=404, detail="Attendee not found")
-        if data.creator not in data.attendees:
-            data.attendees.append(ObjectId(data.creator))
-        data.attendees = [ObjectId(attendee) for attendee in data.attendees]
-
-        collection: Collection = mongo["events"]
-
-        # Check if title exists with a different event_id
-        existing_event = collection.find_one(
-            {"title": data.title, "_id": {"$ne": ObjectId(event_id)}}
-        )
-        if existing_event:
+        data.attendees = await validate_event_users(data.creator, data.attendees, mongo)
+        collection: AsyncCollection = mongo["events"]
+
+        # Update event, titles are unique through the "title_unique" index
+        try:
+            event: dict | None = await collection.find_one_and_update(
+                {"_id": ObjectId(event_id)},
+                {"$set": data.model_dump()},
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError as e:
             raise HTTPException(
                 status_code=409, detail="Event with title already exists"
-            )
-        # Update event
-        event: dict | None = collection.find_one_and_update(
-            {"_id": ObjectId(event_id)},
-            {"$set": data.model_dump()},
-            return_document=True,
-        )
+            ) from e
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
-        redis.delete(f"event:{event_id}")
+        await invalidate_event(event_id, redis)
+
+        res = Event(**event)
+        # Replace the scheduled reminders and agenda entries with the updated ones
+        await schedule_reminders(res, redis)
+        await update_agendas([res], redis)
+        await update_freebusy([res], redis)
+        return res
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+def bulk_error_detail(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, item['loc']))}: {item['msg']}" for item in error.errors()
+    )
+
+
+async def import_events(
+    items: list[Any], mongo: AsyncDatabase, redis: Redis, ordered: bool = False
+) -> BulkImportResult:
+    """Create or update many events with one validation query and one bulk write.
+
+    Args:
+        items (list[Any]): events to import, those with an ``event_id`` are
+            updated and the others created
+        mongo (AsyncDatabase): mongo database
+        redis (Redis): redis client
+        ordered (bool): stop at the first failed item, later items are skipped
 
-        # Add updated reminders to Redis
-        for rem in event["reminders"]:
-            reminder_time: datetime = event["start_time"] - timedelta(
-                minutes=rem["reminder_time"]
+    Returns:
+        BulkImportResult: counts and the result of every item
+    """
+    try:
+        if len(items) > settings.app.bulk_max_events:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {settings.app.bulk_max_events} events per import",
             )
-            if reminder_time > datetime.now():
-                redis.zadd(
-                    f"event_r:{event_id}",
-                    {event["title"]: reminder_time.timestamp()},
+        results: dict[int, BulkItemResult] = {}
+        events: dict[int, EventBulkItem] = {}
+        for index, item in enumerate(items):
+            try:
+                event = EventBulkItem.model_validate(item)
+            except ValidationError as e:
+                results[index] = BulkItemResult(
+                    index=index,
+                    status="failed",
+                    status_code=422,
+                    detail=bulk_error_detail(e),
+                )
+                continue
+            ids = [event.creator, *event.attendees]
+            if event.event_id is not None:
+                ids.append(event.event_id)
+            if not all(ObjectId.is_valid(id_) for id_ in ids):
+                results[index] = BulkItemResult(
+                    index=index, status="failed", status_code=400, detail="Invalid ID"
                 )
-        return Event(**event)
+                continue
+            events[index] = event
+
+        # One query for every referenced user and one for the updated events
+        user_ids = {
+            ObjectId(user_id)
+            for event in events.values()
+            for user_id in (event.creator, *event.attendees)
+        }
+        found_users = {
+            user["_id"]
+            for user in await mongo["users"]
+            .find({"_id": {"$in": list(user_ids)}}, {"_id": 1})
+            .to_list()
+        }
+        update_ids = [
+            ObjectId(event.event_id)
+            for event in events.values()
+            if event.event_id is not None
+        ]
+        found_events = (
+            {
+                event["_id"]
+                for event in await mongo["events"]
+                .find({"_id": {"$in": update_ids}}, {"_id": 1})
+                .to_list()
+            }
+            if update_ids
+            else set()
+        )
+        for index, event in list(events.items()):
+            missing = [
+                user_id
+                for user_id in event.attendees
+                if ObjectId(user_id) not in found_users
+            ]
+            if ObjectId(event.creator) not in found_users:
+                detail = "Creator not found"
+            elif missing:
+                detail = f"Attendees not found: {', '.join(missing)}"
+            elif event.event_id and ObjectId(event.event_id) not in found_events:
+                detail = "Event not found"
+            else:
+                continue
+            results[index] = BulkItemResult(
+                index=index, status="failed", status_code=404, detail=detail
+            )
+            del events[index]
+
+        # Ordered imports write nothing past the first invalid item
+        first_failure = min(results, default=len(items))
+        if ordered:
+            events = {
+                index: event for index, event in events.items() if index < first_failure
+            }
+
+        operations: list[InsertOne | UpdateOne] = []
+        written: list[tuple[int, Event]] = []
+        for index, event in sorted(events.items()):
+            event.attendees = list(
+                dict.fromkeys(
+                    [*map(ObjectId, event.attendees), ObjectId(event.creator)]
+                )
+            )
+            document = event.model_dump(exclude={"event_id"})
+            if event.event_id is not None:
+                event_id = ObjectId(event.event_id)
+                operations.append(UpdateOne({"_id": event_id}, {"$set": document}))
+            else:
+                event_id = ObjectId()
+                operations.append(InsertOne({"_id": event_id, **document}))
+            written.append((index, Event(**{**document, "_id": event_id})))
+
+        write_errors: dict[int, dict] = {}
+        executed = len(operations)
+        if operations:
+            try:
+                await mongo["events"].bulk_write(operations, ordered=ordered)
+            except BulkWriteError as e:
+                write_errors = {
+                    error["index"]: error for error in e.details["writeErrors"]
+                }
+                if ordered:
+                    # Ordered writes stop at the first error
+                    executed = min(write_errors) + 1
+
+        succeeded: list[Event] = []
+        updated_ids: list[str] = []
+        for position, (index, event) in enumerate(written):
+            error = write_errors.get(position)
+            if error is not None:
+                duplicate = error["code"] == DUPLICATE_KEY_ERROR
+                results[index] = BulkItemResult(
+                    index=index,
+                    status="failed",
+                    status_code=409 if duplicate else 500,
+                    detail="Event with title already exists"
+                    if duplicate
+                    else "Write failed",
+                )
+            elif position >= executed:
+                results[index] = BulkItemResult(index=index, status="skipped")
+            else:
+                updated = events[index].event_id is not None
+                results[index] = BulkItemResult(
+                    index=index,
+                    status="updated" if updated else "created",
+                    event_id=event.event_id,
+                )
+                succeeded.append(event)
+                if updated:
+                    updated_ids.append(event.event_id)
+
+        for index in range(len(items)):
+            results.setdefault(index, BulkItemResult(index=index, status="skipped"))
+
+        if succeeded:
+            # The events are committed, a failure past this point must not
+            # hide the results from the client
+            side_effects = {
+                "reminders": schedule_many_reminders(succeeded, redis),
+                "agendas": update_agendas(succeeded, redis),
+                "free/busy": update_freebusy(succeeded, redis),
+                "cache invalidation": invalidate_many_events(updated_ids, redis),
+            }
+            for name, side_effect in side_effects.items():
+                try:
+                    await side_effect
+                except Exception as e:
+                    logger.error(
+                        f"Bulk import {name} failed for {len(succeeded)} events: {e}"
+                    )
+
+        ordered_results = [results[index] for index in range(len(items))]
+        return BulkImportResult(
+            **Counter(result.status for result in ordered_results),
+            items=ordered_results,
+        )
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -327,14 +968,18 @@ def update_event(
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
-def delete_event(event_id: str, mongo: MongoClient, redis: Redis) -> None:
+async def delete_event(event_id: str, mongo: AsyncDatabase, redis: Redis) -> None:
     try:
-        collection: Collection = mongo["events"]
-        event: dict | None = collection.find_one({"_id": ObjectId(event_id)})
+        collection: AsyncCollection = mongo["events"]
+        event: dict | None = await collection.find_one_and_delete(
+            {"_id": ObjectId(event_id)}
+        )
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
-        collection.delete_one({"_id": ObjectId(event_id)})
-        redis.delete(f"event:{event_id}")
+        await invalidate_event(event_id, redis)
+        await cancel_reminders(event_id, redis)
+        await remove_from_agendas(event_id, redis)
+        await remove_from_freebusy(event_id, redis)
         return {"detail": "Event deleted successfully"}
     except HTTPException as e:
         raise e
@@ -0,0 +1,298 @@
+"""Per-process free/busy index of event attendees.
+
+Every user's events are kept as intervals sorted by start time, so the
+events overlapping a window are found by bisection. Timelines are read from
+Mongo on first use, with a single query for all missing users, and kept in
+an LRU bounded by ``cache.freebusy_max_users`` and ``cache.freebusy_ttl``.
+
+Event writes are applied to the timelines in place instead of rebuilding
+them: the writing process applies them at once and publishes them on
+``FREEBUSY_CHANNEL`` for every other process. Changes are idempotent, so a
+process receiving its own change again is harmless.
+"""
+
+import asyncio
+import bisect
+from collections import Counter, OrderedDict, defaultdict
+from datetime import UTC, datetime
+import heapq
+import json
+import time
+from app.cache import cache_stats
+from app.config import settings
+from app.databases import clients
+from app.src.events.agenda import agenda_score
+from app.src.events.schemas import Event
+from bson import ObjectId
+from loguru import logger
+from pymongo.asynchronous.database import AsyncDatabase
+from redis.asyncio import Redis
+
+FREEBUSY_CHANNEL = "freebusy:changed"
+
+# Start and end timestamps and the event ID
+Interval = tuple[float, float, str]
+
+
+def from_score(value: float) -> datetime:
+    """Naive UTC datetime of a timestamp, as Mongo returns them."""
+    return datetime.fromtimestamp(value, UTC).replace(tzinfo=None)
+
+
+class Timeline:
+    """Events of one user as intervals sorted by start time."""
+
+    def __init__(self, intervals: list[Interval]) -> None:
+        self.intervals = sorted(intervals)
+        self.bounds = {event_id: (start, end) for start, end, event_id in intervals}
+        # Bounds how far before a window an overlapping event may start
+        self.max_duration = max(
+            (end - start for start, end, _ in intervals), default=0.0
+        )
+
+    def add(self, event_id: str, start: float, end: float) -> None:
+        self.remove(event_id)
+        bisect.insort(self.intervals, (start, end, event_id))
+        self.bounds[event_id] = (start, end)
+        self.max_duration = max(self.max_duration, end - start)
+
+    def remove(self, event_id: str) -> None:
+        bounds = self.bounds.pop(event_id, None)
+        if bounds is not None:
+            del self.intervals[bisect.bisect_left(self.intervals, (*bounds, event_id))]
+
+    def overlapping(self, start: float, end: float) -> list[Interval]:
+        """Intervals overlapping ``[start, end)``, ordered by start time."""
+        low = bisect.bisect_left(self.intervals, (start - self.max_duration,))
+        high = bisect.bisect_left(self.intervals, (end,))
+        return [
+            interval for interval in self.intervals[low:high] if interval[1] > start
+        ]
+
+
+class FreeBusyIndex:
+    """LRU of user timelines, kept current by event changes."""
+
+    def __init__(self) -> None:
+        self._timelines: OrderedDict[str, tuple[float, Timeline]] = OrderedDict()
+        # Users whose stored timeline holds each event
+        self._event_users: defaultdict[str, set[str]] = defaultdict(set)
+        # Timeline loads in flight and the changes they may have missed
+        self._loading: Counter[str] = Counter()
+        self._changes: Counter[str] = Counter()
+        self._task: asyncio.Task | None = None
+
+    async def timelines(
+        self, user_ids: list[str], mongo: AsyncDatabase
+    ) -> dict[str, Timeline]:
+        """Timelines of users, the missing ones read with a single query.
+
+        Args:
+            user_ids (list[str]): user IDs
+            mongo (AsyncDatabase): mongo database
+
+        Returns:
+            dict[str, Timeline]: timelines by user ID
+        """
+        found: dict[str, Timeline] = {}
+        missing: list[str] = []
+        now = time.monotonic()
+        for user_id in dict.fromkeys(user_ids):
+            entry = self._timelines.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._timelines.move_to_end(user_id)
+                cache_stats.hit("freebusy_local")
+                found[user_id] = entry[1]
+            else:
+                cache_stats.miss("freebusy_local")
+                missing.append(user_id)
+        if missing:
+            found.update(await self._load(missing, mongo))
+        return found
+
+    async def _load(
+        self, user_ids: list[str], mongo: AsyncDatabase
+    ) -> dict[str, Timeline]:
+        observed = {user_id: self._changes[user_id] for user_id in user_ids}
+        self._loading.update(user_ids)
+        try:
+            events = (
+                await mongo["events"]
+                .find(
+                    {"attendees": {"$in": [ObjectId(user_id) for user_id in user_ids]}},
+                    {"start_time": 1, "end_time": 1, "attendees": 1},
+                )
+                .to_list()
+            )
+            intervals: defaultdict[str, list[Interval]] = defaultdict(list)
+            for event in events:
+                interval = (
+                    agenda_score(event["start_time"]),
+                    agenda_score(event["end_time"]),
+                    str(event["_id"]),
+                )
+                for attendee in event["attendees"]:
+                    intervals[str(attendee)].append(interval)
+
+            timelines = {user_id: Timeline(intervals[user_id]) for user_id in user_ids}
+            for user_id, timeline in timelines.items():
+                # A change applied during the read may be missing from it
+                if self._changes[user_id] == observed[user_id]:
+                    self._store(user_id, timeline)
+            return timelines
+        finally:
+            self._loading.subtract(user_ids)
+            for user_id in user_ids:
+                if self._loading[user_id] <= 0:
+                    del self._loading[user_id]
+                    self._changes.pop(user_id, None)
+
+    def _store(self, user_id: str, timeline: Timeline) -> None:
+        self._evict(user_id)
+        expires = time.monotonic() + settings.cache.freebusy_ttl
+        self._timelines[user_id] = (expires, timeline)
+        for event_id in timeline.bounds:
+            self._event_users[event_id].add(user_id)
+        while len(self._timelines) > settings.cache.freebusy_max_users:
+            self._evict(next(iter(self._timelines)))
+
+    def _evict(self, user_id: str) -> None:
+        entry = self._timelines.pop(user_id, None)
+        if entry is None:
+            return
+        for event_id in entry[1].bounds:
+            users = self._event_users.get(event_id)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._event_users[event_id]
+
+    def clear(self) -> None:
+        self._timelines.clear()
+        self._event_users.clear()
+        # Loads in flight may have missed anything
+        for user_id in self._loading:
+            self._changes[user_id] += 1
+
+    def apply(self, changes: list[dict]) -> None:
+        """Apply event changes, an event without attendees is removed."""
+        for change in changes:
+            event_id = change["event_id"]
+            previous = self._event_users.pop(event_id, set())
+            for user_id in previous:
+                self._timelines[user_id][1].remove(event_id)
+            for user_id in previous | set(change["attendees"]):
+                if user_id in self._loading:
+                    self._changes[user_id] += 1
+            for user_id in change["attendees"]:
+                entry = self._timelines.get(user_id)
+                if entry is not None:
+                    entry[1].add(event_id, change["start"], change["end"])
+                    self._event_users[event_id].add(user_id)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with clients.get_redis().pubsub() as pubsub:
+                    await pubsub.subscribe(FREEBUSY_CHANNEL)
+                    # Anything published while not subscribed was missed
+                    self.clear()
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=5
+                        )
+                        if message and message["type"] == "message":
+                            self.apply(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Free/busy listener error: {e}")
+                self.clear()
+                await asyncio.sleep(1)
+
+
+freebusy_index = FreeBusyIndex()
+
+
+async def publish_changes(changes: list[dict], redis: Redis) -> None:
+    freebusy_index.apply(changes)
+    try:
+        await redis.publish(FREEBUSY_CHANNEL, json.dumps(changes))
+    except Exception as e:
+        logger.error(f"Free/busy publish failed for {len(changes)} events: {e}")
+
+
+async def update_freebusy(events: list[Event], redis: Redis) -> None:
+    """Record created or updated events in every process."""
+    await publish_changes(
+        [
+            {
+                "event_id": event.event_id,
+                "start": agenda_score(event.start_time),
+                "end": agenda_score(event.end_time),
+                "attendees": event.attendees,
+            }
+            for event in events
+        ],
+        redis,
+    )
+
+
+async def remove_from_freebusy(event_id: str, redis: Redis) -> None:
+    """Remove a deleted event in every process."""
+    await publish_changes([{"event_id": event_id, "attendees": []}], redis)
+
+
+def busy_intervals(
+    timeline: Timeline, start: float, end: float
+) -> list[tuple[float, float]]:
+    """Merged busy periods of a timeline, clipped to ``[start, end)``."""
+    merged: list[tuple[float, float]] = []
+    for busy_start, busy_end, _ in timeline.overlapping(start, end):
+        busy_start, busy_end = max(busy_start, start), min(busy_end, end)
+        if merged and busy_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], busy_end))
+        else:
+            merged.append((busy_start, busy_end))
+    return merged
+
+
+def free_slots(
+    timelines: list[Timeline], start: float, end: float, duration: float, limit: int
+) -> list[tuple[float, float]]:
+    """Gaps of at least ``duration`` seconds in which every timeline is free.
+
+    The busy intervals of each timeline are already sorted, so they are
+    merged lazily and swept once.
+
+    Args:
+        timelines (list[Timeline]): timelines of every participant
+        start (float): window start timestamp
+        end (float): window end timestamp
+        duration (float): minimal slot length in seconds
+        limit (int): maximum number of slots
+
+    Returns:
+        list[tuple[float, float]]: free slots, ordered by start time
+    """
+    slots: list[tuple[float, float]] = []
+    cursor = start
+    busy = heapq.merge(*(timeline.overlapping(start, end) for timeline in timelines))
+    for busy_start, busy_end, _ in busy:
+        if busy_start - cursor >= duration:
+            slots.append((cursor, busy_start))
+            if len(slots) >= limit:
+                return slots
+        cursor = max(cursor, busy_end)
+    if end - cursor >= duration:
+        slots.append((cursor, end))
+    return slots
@@ -1,51 +1,116 @@
-from typing import Annotated
+from typing import Annotated, Any
 from app.annotations import (
+    AFTER_CURSOR_ANNOTATION,
     ATTEND_ANNOTATION,
+    BEFORE_CURSOR_ANNOTATION,
+    FIELDS_ANNOTATION,
+    FROM_ANNOTATION,
     ID_PATH_ANNOTATION,
     INCLUDE_PASS_EVENT_ANNOTATION,
+    LIMIT_ANNOTATION,
+    ORDERED_ANNOTATION,
+    SORT_ANNOTATION,
+    STREAM_ANNOTATION,
+    TO_ANNOTATION,
 )
 from app.databases import get_mongo_client, get_redis_client
+from app.src.auth.middleware import get_current_user
+from app.streaming import read_documents, stream_documents
 from app.src.events.controllers import (
+    check_conflicts,
     create_event,
     delete_event,
+    find_free_slots,
+    find_events,
     get_event,
     get_event_users,
     get_events,
+    import_events,
     update_event,
 )
-from fastapi import APIRouter, Depends
-from app.src.events.schemas import Event, EventAttendees, EventCreate
+from app.src.users.schemas import User
+from app.src.websockets.controllers import get_event_chat
+from app.src.websockets.schemas import ChatHistory
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from app.src.events.schemas import (
+    BulkImportResult,
+    Conflict,
+    ConflictCheck,
+    Event,
+    EventAttendees,
+    EventCreate,
+    FreeSlotQuery,
+    TimeSlot,
+)
 
 
 router = APIRouter(prefix="/events", tags=["events"])
 
 
-@router.get("/", response_model=list[Event], summary="Get all events")
-def endp_get_events(
+@router.get(
+    "/",
+    response_model=list[Event] | list[dict[str, Any]],
+    summary="Get all events",
+)
+async def endp_get_events(
+    response: Response,
     mongo: Annotated[get_mongo_client, Depends()],
     redis: Annotated[get_redis_client, Depends()],
     attend: ATTEND_ANNOTATION = None,
     include_pass_event: INCLUDE_PASS_EVENT_ANNOTATION = False,
     include_upcoming_event: INCLUDE_PASS_EVENT_ANNOTATION = False,
     include_current_event: INCLUDE_PASS_EVENT_ANNOTATION = False,
-) -> list[Event]:
-    return get_events(
+    after: AFTER_CURSOR_ANNOTATION = None,
+    limit: LIMIT_ANNOTATION = None,
+    sort: SORT_ANNOTATION = None,
+    fields: FIELDS_ANNOTATION = None,
+    stream: STREAM_ANNOTATION = None,
+    time_from: FROM_ANNOTATION = None,
+    time_to: TO_ANNOTATION = None,
+) -> list[Event] | list[dict[str, Any]] | StreamingResponse:
+    if stream:
+        cursor = find_events(
+            mongo=mongo,
+            attend=attend,
+            include_pass_event=include_pass_event,
+            include_upcoming_event=include_upcoming_event,
+            include_current_event=include_current_event,
+            after=after,
+            limit=limit,
+            sort=sort,
+            fields=fields,
+            time_from=time_from,
+            time_to=time_to,
+        )
+        return stream_documents(cursor, stream)
+
+    events, next_cursor = await get_events(
         mongo=mongo,
         redis=redis,
         attend=attend,
         include_pass_event=include_pass_event,
         include_upcoming_event=include_upcoming_event,
         include_current_event=include_current_event,
+        after=after,
+        limit=limit,
+        sort=sort,
+        fields=fields,
+        time_from=time_from,
+        time_to=time_to,
     )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return events
 
 
 @router.get("/{event_id}", response_model=Event, summary="Get event by ID")
-def endp_get_event(
+async def endp_get_event(
     event_id: ID_PATH_ANNOTATION,
     mongo: Annotated[get_mongo_client, Depends()],
     redis: Annotated[get_redis_client, Depends()],
 ) -> Event:
-    return get_event(event_id=event_id, mongo=mongo, redis=redis)
+    return await get_event(event_id=event_id, mongo=mongo, redis=redis)
 
 
 @router.get(
@@ -53,37 +118,102 @@ def endp_get_event(
     response_model=EventAttendees,
     summary="Get event by ID joined with users",
 )
-def endp_get_event_users(
+async def endp_get_event_users(
     event_id: ID_PATH_ANNOTATION,
     mongo: Annotated[get_mongo_client, Depends()],
     redis: Annotated[get_redis_client, Depends()],
 ) -> EventAttendees:
-    return get_event_users(event_id=event_id, mongo=mongo, redis=redis)
+    return await get_event_users(event_id=event_id, mongo=mongo, redis=redis)
+
+
+@router.get(
+    "/{event_id}/chat",
+    response_model=ChatHistory,
+    summary="Get event chat history, newest first",
+)
+async def endp_get_event_chat(
+    event_id: ID_PATH_ANNOTATION,
+    user: Annotated[User, Depends(get_current_user)],
+    mongo: Annotated[get_mongo_client, Depends()],
+    before: BEFORE_CURSOR_ANNOTATION = None,
+    limit: LIMIT_ANNOTATION = None,
+) -> ChatHistory:
+    return await get_event_chat(
+        event_id=event_id, user_id=user.id, mongo=mongo, before=before, limit=limit
+    )
 
 
 @router.post("/", response_model=Event, summary="Create a new event")
-def endp_create_event(
+async def endp_create_event(
     data: EventCreate,
     mongo: Annotated[get_mongo_client, Depends()],
     redis: Annotated[get_redis_client, Depends()],
 ) -> Event:
-    return create_event(data=data, mongo=mongo, redis=redis)
+    return await create_event(data=data, mongo=mongo, redis=redis)
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkImportResult,
+    summary="Create or update events from a JSON array or NDJSON upload",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                media_type: {"schema": {"type": "array", "items": {"type": "object"}}}
+                for media_type in ("application/json", "application/x-ndjson")
+            },
+        }
+    },
+)
+async def endp_import_events(
+    request: Request,
+    mongo: Annotated[get_mongo_client, Depends()],
+    redis: Annotated[get_redis_client, Depends()],
+    ordered: ORDERED_ANNOTATION = False,
+) -> BulkImportResult:
+    items = await read_documents(request)
+    return await import_events(items=items, mongo=mongo, redis=redis, ordered=ordered)
+
+
+@router.post(
+    "/conflicts",
+    response_model=list[Conflict],
+    summary="Find events of the attendees overlapping a time window",
+)
+async def endp_check_conflicts(
+    data: ConflictCheck,
+    mongo: Annotated[get_mongo_client, Depends()],
+) -> list[Conflict]:
+    return await check_conflicts(data=data, mongo=mongo)
+
+
+@router.post(
+    "/free-slots",
+    response_model=list[TimeSlot],
+    summary="Find time slots in which every attendee is free",
+)
+async def endp_find_free_slots(
+    data: FreeSlotQuery,
+    mongo: Annotated[get_mongo_client, Depends()],
+) -> list[TimeSlot]:
+    return await find_free_slots(data=data, mongo=mongo)
 
 
 @router.put("/{event_id}", response_model=Event, summary="Update event by ID")
-def endp_update_event(
+async def endp_update_event(
     event_id: ID_PATH_ANNOTATION,
     data: EventCreate,
     mongo: Annotated[get_mongo_client, Depends()],
     redis: Annotated[get_redis_client, Depends()],
 ) -> Event:
-    return update_event(data=data, mongo=mongo, event_id=event_id, redis=redis)
+    return await update_event(data=data, mongo=mongo, event_id=event_id, redis=redis)
 
 
 @router.delete("/{event_id}", summary="delete event by ID")
-def endp_delete_event(
+async def endp_delete_event(
     event_id: ID_PATH_ANNOTATION,
     mongo: Annotated[get_mongo_client, Depends()],
     redis: Annotated[get_redis_client, Depends()],
 ):
-    return delete_event(mongo=mongo, event_id=event_id, redis=redis)
+    return await delete_event(mongo=mongo, event_id=event_id, redis=redis)
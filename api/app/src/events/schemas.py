@@ -1,9 +1,17 @@
-from datetime import datetime
+from datetime import UTC, datetime
+from typing import Literal
 import uuid
 from app.src.users.schemas import User, UserCreator
 from pydantic import BaseModel, Field, field_validator
 
 
+def naive_utc(value: datetime) -> datetime:
+    """UTC time without tzinfo, as Mongo stores and returns datetimes."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(UTC).replace(tzinfo=None)
+
+
 class Reminder(BaseModel):
     reminder_time: int
     reminder_text: str
@@ -65,5 +73,65 @@ class EventCreate(BaseModel):
         Reminder(reminder_time=15, reminder_text="15 minutes before"),
     ]  # Připomenutí v minutách před začátkem
 
+    @field_validator("start_time", "end_time")
+    @classmethod
+    def transform_time(cls, value: datetime) -> datetime:
+        return naive_utc(value)
+
 
 class EventUpdate(EventCreate): ...
+
+
+class EventBulkItem(EventCreate):
+    # Updates the event when given, creates a new one otherwise
+    event_id: str | None = None
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: Literal["created", "updated", "failed", "skipped"]
+    event_id: str | None = None
+    status_code: int | None = None
+    detail: str | None = None
+
+
+class TimeSlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+
+class FreeBusy(BaseModel):
+    user_id: str
+    busy: list[TimeSlot]
+
+
+class ConflictCheck(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    attendees: list[str] = Field(max_length=1000)
+    # Event being edited, its own interval is not a conflict
+    event_id: str | None = None
+
+
+class Conflict(BaseModel):
+    user_id: str
+    event_id: str
+    start_time: datetime
+    end_time: datetime
+
+
+class FreeSlotQuery(BaseModel):
+    attendees: list[str] = Field(max_length=1000)
+    # Window searched for free slots
+    start_time: datetime
+    end_time: datetime
+    duration: int = Field(ge=1, description="Slot length in minutes")
+    limit: int = Field(default=10, ge=1, le=100)
+
+
+class BulkImportResult(BaseModel):
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    skipped: int = 0
+    items: list[BulkItemResult] = []
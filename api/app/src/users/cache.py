@@ -0,0 +1,211 @@
+import time
+from app.cache import (
+    FILL_SCRIPT,
+    CacheLookup,
+    Loader,
+    bump_versions,
+    cache_stats,
+    fill_args,
+    local_cache,
+    parse_entry,
+    publish_invalidation,
+    read_through,
+    write_model,
+)
+from app.config import settings
+from app.src.users.schemas import User
+from loguru import logger
+from redis.asyncio import Redis
+
+# Cached user IDs scored by fill time, oldest are evicted past the budget
+USER_INDEX_KEY = "users:cache:index"
+# Serialized size of each cached user and their total, in bytes
+USER_SIZES_KEY = "users:cache:sizes"
+USER_BYTES_KEY = "users:cache:bytes"
+
+# KEYS: index, sizes, total; ARGV: now, max age, max bytes, entry key prefix,
+# then user ID and payload size pairs
+BUDGET_SCRIPT = """
+local total = tonumber(redis.call('GET', KEYS[3]) or '0')
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1] - ARGV[2])
+for _, id in ipairs(expired) do
+    total = total - tonumber(redis.call('HGET', KEYS[2], id) or '0')
+    redis.call('HDEL', KEYS[2], id)
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1] - ARGV[2])
+for i = 5, #ARGV, 2 do
+    local previous = tonumber(redis.call('HGET', KEYS[2], ARGV[i]) or '0')
+    total = total + tonumber(ARGV[i + 1]) - previous
+    redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+    redis.call('ZADD', KEYS[1], ARGV[1], ARGV[i])
+end
+local evicted = 0
+while total > tonumber(ARGV[3]) do
+    local oldest = redis.call('ZPOPMIN', KEYS[1])
+    if #oldest == 0 then
+        total = 0
+        break
+    end
+    total = total - tonumber(redis.call('HGET', KEYS[2], oldest[1]) or '0')
+    redis.call('HDEL', KEYS[2], oldest[1])
+    redis.call('DEL', ARGV[4] .. oldest[1])
+    evicted = evicted + 1
+end
+redis.call('SET', KEYS[3], math.max(total, 0))
+return evicted
+"""
+
+
+def user_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def user_version_key(user_id: str) -> str:
+    return f"user:{user_id}:version"
+
+
+async def read_user(user_id: str, load: Loader, redis: Redis) -> User:
+    return await read_through(
+        "user", user_key(user_id), user_version_key(user_id), User, load, redis
+    )
+
+
+async def cache_user(user: User, lookup: CacheLookup, redis: Redis) -> None:
+    size = await write_model(
+        user_key(user.id),
+        user,
+        settings.cache.user_ttl,
+        {user_version_key(user.id): lookup.version},
+        lookup,
+        redis,
+    )
+    if size:
+        await enforce_budget({user.id: size}, redis)
+
+
+async def read_cached_users(
+    user_ids: list[str], redis: Redis
+) -> tuple[dict[str, User], dict[str, str], int]:
+    """Read many users from the local cache, then with a single ``MGET``.
+
+    Args:
+        user_ids (list[str]): user IDs
+        redis (Redis): redis client
+
+    Returns:
+        tuple[dict[str, User], dict[str, str], int]: cached users by ID, the
+            versions of the missing users and the local cache epoch, to pass
+            to ``cache_users`` after reading them from the database
+    """
+    found: dict[str, User] = {}
+    missing: list[str] = []
+    for user_id in dict.fromkeys(user_ids):
+        user = local_cache.get("user", user_key(user_id))
+        if user is not None:
+            found[user_id] = user
+        else:
+            missing.append(user_id)
+    epoch = local_cache.epoch
+    if not missing:
+        return found, {}, epoch
+
+    try:
+        values = await redis.mget(
+            [
+                key
+                for user_id in missing
+                for key in (user_key(user_id), user_version_key(user_id))
+            ]
+        )
+    except Exception as e:
+        logger.warning(f"Cache read failed for {len(missing)} users: {e}")
+        return found, {user_id: "" for user_id in missing}, epoch
+
+    versions: dict[str, str] = {}
+    for index, user_id in enumerate(missing):
+        version = values[2 * index + 1] or "0"
+        cached = parse_entry(values[2 * index], version)
+        if cached is not None and cached.fresh:
+            cache_stats.hit("user")
+            user = User.model_validate_json(cached.payload)
+            local_cache.set(user_key(user_id), user, len(cached.payload), epoch)
+            found[user_id] = user
+        else:
+            cache_stats.miss("user")
+            versions[user_id] = version
+    return found, versions, epoch
+
+
+async def cache_users(
+    users: list[User], versions: dict[str, str], epoch: int, redis: Redis
+) -> None:
+    """Fill the cache with users read after ``read_cached_users``, pipelined."""
+    users = [user for user in users if versions.get(user.id)]
+    if not users:
+        return
+    payloads = [user.model_dump_json(by_alias=True) for user in users]
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for user, payload in zip(users, payloads, strict=True):
+                pipe.eval(
+                    FILL_SCRIPT,
+                    *fill_args(
+                        user_key(user.id),
+                        payload,
+                        settings.cache.user_ttl,
+                        {user_version_key(user.id): versions[user.id]},
+                    ),
+                )
+            results = await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Cache fill failed for {len(users)} users: {e}")
+        return
+
+    stored: dict[str, int] = {}
+    for user, payload, result in zip(users, payloads, results, strict=True):
+        if result:
+            local_cache.set(user_key(user.id), user, len(payload), epoch)
+            stored[user.id] = len(payload)
+    if stored:
+        await enforce_budget(stored, redis)
+
+
+async def enforce_budget(sizes: dict[str, int], redis: Redis) -> None:
+    """Record fills and their payload sizes, then evict the oldest users until
+    the cached payloads fit in ``user_max_bytes``.
+    """
+    try:
+        evicted = await redis.eval(
+            BUDGET_SCRIPT,
+            3,
+            USER_INDEX_KEY,
+            USER_SIZES_KEY,
+            USER_BYTES_KEY,
+            time.time(),
+            settings.cache.user_ttl * (1 + settings.cache.ttl_jitter)
+            + settings.cache.stale_ttl,
+            settings.cache.user_max_bytes,
+            user_key(""),
+            *(value for pair in sizes.items() for value in pair),
+        )
+    except Exception as e:
+        logger.warning(f"Cache budget update failed: {e}")
+        return
+    if evicted:
+        logger.debug("Evicted {} users from the cache", evicted)
+
+
+async def invalidate_user(user_id: str, redis: Redis) -> None:
+    await bump_versions(redis, user_version_key(user_id))
+    await publish_invalidation(redis, user_key(user_id))
+
+
+async def write_through_user(user: User, redis: Redis) -> None:
+    """Cache an updated user, called after ``invalidate_user``."""
+    epoch = local_cache.epoch
+    try:
+        version = await redis.get(user_version_key(user.id)) or "0"
+    except Exception as e:
+        logger.warning(f"Cache write-through failed for user {user.id}: {e}")
+        return
+    await cache_user(user, CacheLookup(version, epoch), redis)
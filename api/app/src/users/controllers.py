@@ -1,60 +1,144 @@
 from functools import cache
-import json
+from app.cache import CacheLookup
+from app.config import settings
+from app.pagination import (
+    encode_documents,
+    find_page,
+    paginate,
+    parse_projection,
+    parse_sort,
+)
+from app.src.events.cache import invalidate_user_events
+from app.src.users.cache import (
+    cache_user,
+    cache_users,
+    invalidate_user,
+    read_cached_users,
+    read_user,
+    write_through_user,
+)
 from app.src.users.schemas import User, UserUpdate
 from bson import ObjectId
 from fastapi import HTTPException
 from loguru import logger
-from pymongo import MongoClient
-from pymongo.synchronous.collection import Collection
-from redis import Redis
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.cursor import AsyncCursor
+from pymongo.asynchronous.database import AsyncDatabase
+from redis.asyncio import Redis
 
 
-def get_users(mongo: MongoClient) -> list[User]:
-    """Get all users.
+USER_FIELDS = {"username", "first_name", "last_name", "email"}
+USER_SORT_FIELDS = {"username": str, "email": str}
+
+
+async def get_users(
+    mongo: AsyncDatabase,
+    after: str | None = None,
+    limit: int | None = None,
+    sort: str | None = None,
+    fields: str | None = None,
+) -> tuple[list[User] | list[dict], str | None]:
+    """Get a page of users.
 
     Args:
-        mongo (MongoClient): mongo client
+        mongo (AsyncDatabase): mongo database
+        after (str | None): cursor returned with the previous page
+        limit (int | None): page size, all users when None
+        sort (str | None): field to sort by, ``-`` prefix for descending
+        fields (str | None): comma separated fields to return
 
     Returns:
-        list[User]: Pydantic model for users
+        tuple[list[User] | list[dict], str | None]: Pydantic model for users,
+            partial users when ``fields`` is given, and the next page cursor
     """
     try:
-        collection: Collection = mongo["users"]
-        users: list[dict] = list(collection.find())
-        return [User(**user) for user in users]
+        collection: AsyncCollection = mongo["users"]
+        sort_field, direction, sort_type = parse_sort(sort, USER_SORT_FIELDS)
+        projection = parse_projection(fields, USER_FIELDS)
+        users, next_cursor = await paginate(
+            collection,
+            {},
+            sort_field=sort_field,
+            direction=direction,
+            after=after,
+            limit=limit,
+            sort_type=sort_type,
+            projection=projection,
+        )
+        if projection is not None:
+            return encode_documents(users), next_cursor
+        return [User(**user) for user in users], next_cursor
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+def find_users(
+    mongo: AsyncDatabase,
+    after: str | None = None,
+    limit: int | None = None,
+    sort: str | None = None,
+    fields: str | None = None,
+) -> AsyncCursor:
+    """Get a cursor over users for streaming, see ``get_users`` for arguments.
+
+    Returns:
+        AsyncCursor: cursor over user documents without private fields
+    """
+    try:
+        sort_field, direction, sort_type = parse_sort(sort, USER_SORT_FIELDS)
+        return find_page(
+            mongo["users"],
+            {},
+            sort_field=sort_field,
+            direction=direction,
+            after=after,
+            limit=limit,
+            sort_type=sort_type,
+            # Never stream password hashes
+            projection=parse_projection(fields or ",".join(USER_FIELDS), USER_FIELDS),
+        )
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(f"Error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
-def get_user(user_id: str, mongo: MongoClient, redis: Redis) -> User:
+async def load_user(
+    user_id: str, lookup: CacheLookup, mongo: AsyncDatabase, redis: Redis
+) -> User:
+    """Read a user from Mongo and cache it, see ``read_through``."""
+    collection: AsyncCollection = mongo["users"]
+
+    user: dict | None = await collection.find_one({"_id": ObjectId(user_id)})
+
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    res = User(**user)
+
+    await cache_user(res, lookup, redis)
+    return res
+
+
+async def get_user(user_id: str, mongo: AsyncDatabase, redis: Redis) -> User:
     """Get user by ID.
 
     Args:
         user_id (str):  User ID
-        mongo (MongoClient): mongo client
+        mongo (AsyncDatabase): mongo database
 
     Returns:
         User: Pydantic model for user
     """
     try:
-        cache_key: str = f"user:{user_id}"
-        cached_user: str | None = redis.get(cache_key)
-
-        if cached_user:
-            user = json.loads(cached_user)
-            return User(**user)
-
-        collection: Collection = mongo["users"]
-
-        user: dict | None = collection.find_one({"_id": ObjectId(user_id)})
-
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        res = User(**user)
-            
-        redis.set(cache_key, res.model_dump_json())
-        return res
+        return await read_user(
+            user_id,
+            lambda lookup: load_user(user_id, lookup, mongo, redis),
+            redis,
+        )
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -62,26 +146,64 @@ def get_user(user_id: str, mongo: MongoClient, redis: Redis) -> User:
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
-def update_user(user_id: str, data: UserUpdate, mongo: MongoClient) -> dict | None:
+async def get_users_by_ids(
+    user_ids: list[str], mongo: AsyncDatabase, redis: Redis
+) -> dict[str, User]:
+    """Get many users by ID with one cache round trip and one query for misses.
+
+    Args:
+        user_ids (list[str]): User IDs, invalid IDs are ignored
+        mongo (AsyncDatabase): mongo database
+        redis (Redis): redis client
+
+    Returns:
+        dict[str, User]: users by ID, IDs of missing users are left out
+    """
+    user_ids = [user_id for user_id in user_ids if ObjectId.is_valid(user_id)]
+    users, versions, epoch = await read_cached_users(user_ids, redis)
+    if not versions:
+        return users
+
+    collection: AsyncCollection = mongo["users"]
+    loaded = [
+        User(**user)
+        for user in await collection.find(
+            {"_id": {"$in": [ObjectId(user_id) for user_id in versions]}}
+        ).to_list()
+    ]
+    await cache_users(loaded, versions, epoch, redis)
+    users.update((user.id, user) for user in loaded)
+    return users
+
+
+async def update_user(
+    user_id: str, data: UserUpdate, mongo: AsyncDatabase, redis: Redis
+) -> dict | None:
     """Update user by ID.
 
     Args:
         user_id (str):  User ID
         data (UserUpdate):  Data to update
-        mongo (MongoClient): mongo client
+        mongo (AsyncDatabase): mongo database
+        redis (Redis): redis client
 
     Returns:
         dict | None: Updated user
     """
     try:
-        collection: Collection = mongo["users"]
-        user: dict | None = collection.find_one_and_update(
+        collection: AsyncCollection = mongo["users"]
+        user: dict | None = await collection.find_one_and_update(
             {"_id": ObjectId(user_id)},
             {"$set": data.model_dump()},
             return_document=True,
         )
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        await invalidate_user(user_id, redis)
+        # Cached attendee lists of the user's events embed the old profile
+        await invalidate_user_events(user_id, redis)
+        if settings.cache.user_write_through:
+            await write_through_user(User(**user), redis)
         return user
     except HTTPException as e:
         raise e
@@ -1,31 +1,107 @@
-from typing import Annotated
-from app.annotations import ID_PATH_ANNOTATION
+from typing import Annotated, Any
+from app.annotations import (
+    AFTER_CURSOR_ANNOTATION,
+    AGENDA_FROM_ANNOTATION,
+    AGENDA_TO_ANNOTATION,
+    FIELDS_ANNOTATION,
+    FROM_ANNOTATION,
+    ID_PATH_ANNOTATION,
+    LIMIT_ANNOTATION,
+    SORT_ANNOTATION,
+    STREAM_ANNOTATION,
+    TO_ANNOTATION,
+)
 from app.databases import get_mongo_client, get_redis_client
-from app.src.users.controllers import get_user, get_users, update_user
+from app.streaming import stream_documents
+from app.src.events.controllers import get_user_agenda, get_user_freebusy
+from app.src.events.schemas import Event, FreeBusy
+from app.src.users.controllers import find_users, get_user, get_users, update_user
 from app.src.users.schemas import User, UserUpdate
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import StreamingResponse
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-@router.get("/", response_model=list[User], summary="Get all users")
-def endp_get_users(mongo: Annotated[get_mongo_client, Depends()]) -> list[User]:
-    return list(get_users(mongo=mongo))
+@router.get(
+    "/",
+    response_model=list[User] | list[dict[str, Any]],
+    summary="Get all users",
+)
+async def endp_get_users(
+    response: Response,
+    mongo: Annotated[get_mongo_client, Depends()],
+    after: AFTER_CURSOR_ANNOTATION = None,
+    limit: LIMIT_ANNOTATION = None,
+    sort: SORT_ANNOTATION = None,
+    fields: FIELDS_ANNOTATION = None,
+    stream: STREAM_ANNOTATION = None,
+) -> list[User] | list[dict[str, Any]] | StreamingResponse:
+    if stream:
+        cursor = find_users(
+            mongo=mongo, after=after, limit=limit, sort=sort, fields=fields
+        )
+        return stream_documents(cursor, stream)
+
+    users, next_cursor = await get_users(
+        mongo=mongo, after=after, limit=limit, sort=sort, fields=fields
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return users
 
 
 @router.get("/{user_id}", response_model=User, summary="Get user by ID")
-def endp_get_user(
+async def endp_get_user(
     user_id: ID_PATH_ANNOTATION,
     mongo: Annotated[get_mongo_client, Depends()],
     redis: Annotated[get_redis_client, Depends()],
 ) -> User:
-    return get_user(user_id=user_id, mongo=mongo, redis=redis)
+    return await get_user(user_id=user_id, mongo=mongo, redis=redis)
 
 
 @router.put("/{user_id}", response_model=User, summary="Update user by ID")
-def endp_update_user(
+async def endp_update_user(
     user_id: ID_PATH_ANNOTATION,
     data: UserUpdate,
     mongo: Annotated[get_mongo_client, Depends()],
+    redis: Annotated[get_redis_client, Depends()],
 ) -> User:
-    return update_user(user_id=user_id, data=data, mongo=mongo)
+    return await update_user(user_id=user_id, data=data, mongo=mongo, redis=redis)
+
+
+@router.get(
+    "/{user_id}/agenda",
+    response_model=list[Event],
+    summary="Get events the user attends within a time window",
+)
+async def endp_get_user_agenda(
+    user_id: ID_PATH_ANNOTATION,
+    mongo: Annotated[get_mongo_client, Depends()],
+    redis: Annotated[get_redis_client, Depends()],
+    time_from: AGENDA_FROM_ANNOTATION = None,
+    time_to: AGENDA_TO_ANNOTATION = None,
+) -> list[Event]:
+    return await get_user_agenda(
+        user_id=user_id,
+        mongo=mongo,
+        redis=redis,
+        time_from=time_from,
+        time_to=time_to,
+    )
+
+
+@router.get(
+    "/{user_id}/freebusy",
+    response_model=FreeBusy,
+    summary="Get busy periods of the user within a time window",
+)
+async def endp_get_user_freebusy(
+    user_id: ID_PATH_ANNOTATION,
+    mongo: Annotated[get_mongo_client, Depends()],
+    time_from: FROM_ANNOTATION = None,
+    time_to: TO_ANNOTATION = None,
+) -> FreeBusy:
+    return await get_user_freebusy(
+        user_id=user_id, mongo=mongo, time_from=time_from, time_to=time_to
+    )
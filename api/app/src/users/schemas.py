@@ -1,4 +1,3 @@
-from app.src.auth.utils import hash_password
 from pydantic import BaseModel, field_validator
 from pydantic import Field
 import uuid
@@ -36,12 +35,8 @@ class UserCreate(BaseModel):
     first_name: str
     last_name: str
     email: str
-    password: str | bytes
-
-    @field_validator("password")
-    @classmethod
-    def validate_password(cls, value) -> bytes:
-        return hash_password(value)
+    # Hashed by ``register_user`` in the credential service's process pool
+    password: str
 
 
 class UserUpdate(BaseModel):
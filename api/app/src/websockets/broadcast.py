@@ -0,0 +1,136 @@
+import asyncio
+from collections import defaultdict
+import time
+from typing import Protocol
+from app.config import settings
+from app.databases import clients
+from app.metrics import broadcast_deliveries, broadcast_fanout_seconds
+from loguru import logger
+from redis.asyncio.client import PubSub
+
+
+class Subscriber(Protocol):
+    async def send_text(self, data: str) -> None: ...
+
+
+class MemoryBroadcast:
+    """Delivers published messages to subscribers of this process only."""
+
+    def __init__(self) -> None:
+        self.subscribers: dict[str, set[Subscriber]] = defaultdict(set)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        self.subscribers.clear()
+
+    async def subscribe(self, channel: str, subscriber: Subscriber) -> None:
+        self.subscribers[channel].add(subscriber)
+
+    async def unsubscribe(self, channel: str, subscriber: Subscriber) -> None:
+        self.subscribers[channel].discard(subscriber)
+        if not self.subscribers[channel]:
+            del self.subscribers[channel]
+
+    async def publish(self, channel: str, message: str) -> None:
+        await self.deliver(channel, message)
+
+    async def deliver(self, channel: str, message: str) -> None:
+        # Subscribers are queued connections, so each send only enqueues and
+        # the per-connection writer tasks deliver concurrently.
+        started = time.perf_counter()
+        subscribers = list(self.subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            try:
+                await subscriber.send_text(message)
+            except Exception as e:
+                logger.info("Dropping message for a closed subscriber: {}", e)
+        broadcast_fanout_seconds.observe(time.perf_counter() - started)
+        broadcast_deliveries.inc(amount=len(subscribers))
+
+
+class RedisBroadcast(MemoryBroadcast):
+    """Fans messages out across workers through Redis pub/sub.
+
+    Each process holds a single pub/sub connection and subscribes to a
+    channel only while it has at least one local subscriber for it, so the
+    number of Redis subscriptions grows with active channels per process
+    rather than with connected sockets.
+    """
+
+    def __init__(self, prefix: str = "chat:") -> None:
+        super().__init__()
+        self.prefix = prefix
+        self._pubsub: PubSub | None = None
+        self._listening = asyncio.Event()
+        self._reader: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._pubsub = clients.get_redis().pubsub()
+        self._reader = asyncio.create_task(self._read())
+
+    async def stop(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        await super().stop()
+
+    async def subscribe(self, channel: str, subscriber: Subscriber) -> None:
+        first = channel not in self.subscribers
+        await super().subscribe(channel, subscriber)
+        if first:
+            await self._pubsub.subscribe(self.prefix + channel)
+            self._listening.set()
+
+    async def unsubscribe(self, channel: str, subscriber: Subscriber) -> None:
+        await super().unsubscribe(channel, subscriber)
+        if channel not in self.subscribers:
+            await self._pubsub.unsubscribe(self.prefix + channel)
+            if not self.subscribers:
+                self._listening.clear()
+
+    async def publish(self, channel: str, message: str) -> None:
+        await clients.get_redis().publish(self.prefix + channel, message)
+
+    async def _read(self) -> None:
+        while True:
+            await self._listening.wait()
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Broadcast listener error: {e}")
+                await asyncio.sleep(1)
+                await self._resubscribe()
+                continue
+            if message and message["type"] == "message":
+                channel = message["channel"].removeprefix(self.prefix)
+                await self.deliver(channel, message["data"])
+
+    async def _resubscribe(self) -> None:
+        try:
+            await self._pubsub.aclose()
+            self._pubsub = clients.get_redis().pubsub()
+            if self.subscribers:
+                await self._pubsub.subscribe(
+                    *(self.prefix + channel for channel in self.subscribers)
+                )
+        except Exception as e:
+            logger.error(f"Broadcast resubscribe failed: {e}")
+
+
+def create_broadcast() -> MemoryBroadcast:
+    if settings.websockets.broadcast_backend == "redis":
+        return RedisBroadcast()
+    return MemoryBroadcast()
+
+
+chat_broadcast = create_broadcast()
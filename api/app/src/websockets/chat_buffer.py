@@ -0,0 +1,178 @@
+import asyncio
+import time
+import bson
+from app.config import settings
+from app.databases import clients
+from bson.errors import InvalidDocument
+from loguru import logger
+from pymongo.errors import BulkWriteError, DocumentTooLarge
+
+DUPLICATE_KEY_ERROR = 11000
+# Mongo's document size limit
+MAX_DOCUMENT_SIZE = 16 * 1024 * 1024
+
+
+class ChatWriteBuffer:
+    """Write-behind buffer persisting chat messages in batches.
+
+    Messages are broadcast as soon as they arrive and queued here; a
+    background task writes them with an ordered ``insert_many`` whenever
+    ``chat_flush_batch_size`` messages are pending or every
+    ``chat_flush_interval`` seconds. If Mongo is unavailable the batch is kept
+    and retried with a growing delay, and at most ``chat_buffer_max_pending``
+    messages are held, so the loss on a crash or outage is bounded by that
+    limit. A message Mongo rejects, e.g. too large or failing validation, is
+    logged and dropped so it does not block the ones behind it.
+    """
+
+    def __init__(self) -> None:
+        self._buffer: list[dict] = []
+        self._in_flight: list[dict] = []
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.flushed = 0
+        self.dropped = 0
+        self.rejected = 0
+        self._backoff = 0.0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    def add(self, message: dict) -> None:
+        self._buffer.append(message)
+        self._trim()
+        if len(self._buffer) >= settings.websockets.chat_flush_batch_size:
+            self._wakeup.set()
+
+    def _trim(self) -> None:
+        overflow = len(self._buffer) - settings.websockets.chat_buffer_max_pending
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+            logger.error(f"Chat write buffer full, dropped {overflow} messages")
+
+    def pending(self, event_id: str) -> list[dict]:
+        """Messages of an event that are not yet written to Mongo."""
+        return [
+            message
+            for message in self._in_flight + self._buffer
+            if message["event_id"] == event_id
+        ]
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self._buffer:
+            logger.error(f"Chat write buffer lost {len(self._buffer)} messages")
+
+    async def _run(self) -> None:
+        while True:
+            if self._backoff:
+                # Mongo is failing, a full buffer must not hurry the retry
+                await asyncio.sleep(self._backoff)
+            else:
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), settings.websockets.chat_flush_interval
+                    )
+                except TimeoutError:
+                    pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            while self._buffer:
+                size = settings.websockets.chat_flush_batch_size
+                batch = self._in_flight = self._buffer[:size]
+                del self._buffer[:size]
+                start_time = time.perf_counter()
+                # Messages at the head of the batch that are stored or rejected
+                done = written = 0
+                transient = False
+                try:
+                    await clients.get_db()["chat"].insert_many(batch, ordered=True)
+                    done = written = len(batch)
+                except BulkWriteError as e:
+                    done = written = e.details["nInserted"]
+                    errors = e.details["writeErrors"]
+                    if errors and errors[0]["code"] == DUPLICATE_KEY_ERROR:
+                        # A retried message that already reached Mongo
+                        done += 1
+                        written += 1
+                    elif errors:
+                        # The ordered insert stopped at a message Mongo refuses
+                        self._reject(batch[done], errors[0].get("errmsg"))
+                        done += 1
+                    else:
+                        transient = True
+                        logger.error(f"Chat flush partially failed: {e}")
+                except (DocumentTooLarge, InvalidDocument) as e:
+                    # Raised while encoding, find the messages that can not be
+                    # sent, the others are retried and those already written
+                    # are skipped as duplicates
+                    valid = [message for message in batch if self._encodable(message)]
+                    transient = len(valid) == len(batch)
+                    if transient:
+                        logger.error(f"Chat flush failed: {e}")
+                    batch = valid
+                except Exception as e:
+                    transient = True
+                    logger.error(f"Chat flush failed: {e}")
+
+                self._in_flight = []
+                self.flushed += written
+                self.flushes += 1
+                self.last_flush_seconds = time.perf_counter() - start_time
+                self.max_flush_seconds = max(
+                    self.max_flush_seconds, self.last_flush_seconds
+                )
+                # Keep the remaining messages in order for the next flush
+                self._buffer[:0] = batch[done:]
+                self._trim()
+                if transient:
+                    self._backoff = min(
+                        max(self._backoff * 2, settings.websockets.chat_flush_interval),
+                        settings.websockets.chat_flush_max_backoff,
+                    )
+                    break
+                self._backoff = 0.0
+
+    def _reject(self, message: dict, reason: object) -> None:
+        self.rejected += 1
+        logger.error(
+            f"Chat message {message.get('_id')} of event {message.get('event_id')} "
+            f"can not be stored, dropped: {reason}"
+        )
+
+    def _encodable(self, message: dict) -> bool:
+        try:
+            size = len(bson.encode(message))
+        except InvalidDocument as e:
+            self._reject(message, e)
+            return False
+        if size > MAX_DOCUMENT_SIZE:
+            self._reject(message, f"{size} bytes")
+            return False
+        return True
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "chat_buffer_size": len(self._buffer),
+            "chat_flushed_messages": self.flushed,
+            "chat_dropped_messages": self.dropped,
+            "chat_rejected_messages": self.rejected,
+            "chat_flushes": self.flushes,
+            "chat_last_flush_seconds": self.last_flush_seconds,
+            "chat_max_flush_seconds": self.max_flush_seconds,
+        }
+
+
+chat_buffer = ChatWriteBuffer()
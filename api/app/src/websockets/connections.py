@@ -0,0 +1,83 @@
+import asyncio
+from app.config import settings
+from fastapi import WebSocket
+from loguru import logger
+
+
+class QueuedConnection:
+    """WebSocket wrapper that sends through a bounded outbound queue.
+
+    ``send_text`` only enqueues, and a dedicated writer task drains the queue,
+    so a slow client never holds up the broadcaster or other attendees. When
+    the backlog is full the message is dropped or the client is disconnected,
+    depending on ``websockets.slow_client_policy``.
+    """
+
+    def __init__(self, websocket: WebSocket) -> None:
+        self.websocket = websocket
+        self.queue: asyncio.Queue[str] = asyncio.Queue(
+            maxsize=settings.websockets.send_queue_size
+        )
+        self.dropped = 0
+        self.closed = False
+        self._writer: asyncio.Task | None = None
+        self._closer: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._writer = asyncio.create_task(self._write())
+        stats.connections.add(self)
+
+    async def close(self) -> None:
+        self.closed = True
+        stats.connections.discard(self)
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+
+    async def send_text(self, data: str) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            stats.dropped += 1
+            if settings.websockets.slow_client_policy == "disconnect":
+                self.closed = True
+                stats.disconnected += 1
+                logger.info("Disconnecting WebSocket client with a full send queue")
+                self._closer = asyncio.create_task(
+                    self.websocket.close(code=1013, reason="Send backlog exceeded")
+                )
+
+    async def _write(self) -> None:
+        try:
+            while True:
+                data = await self.queue.get()
+                await self.websocket.send_text(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.closed = True
+            logger.info(f"WebSocket writer stopped: {e}")
+
+
+class ConnectionStats:
+    def __init__(self) -> None:
+        self.connections: set[QueuedConnection] = set()
+        self.dropped = 0
+        self.disconnected = 0
+
+    def snapshot(self) -> dict[str, int]:
+        depths = [conn.queue.qsize() for conn in self.connections]
+        return {
+            "connections": len(depths),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped_messages": self.dropped,
+            "disconnected_clients": self.disconnected,
+        }
+
+
+stats = ConnectionStats()
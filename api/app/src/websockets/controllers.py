@@ -0,0 +1,123 @@
+from datetime import datetime
+from app.config import settings
+from app.pagination import decode_cursor, encode_cursor
+from app.src.websockets.chat_buffer import chat_buffer
+from app.src.websockets.schemas import ChatHistory, ChatMessage
+from bson import ObjectId
+from fastapi import HTTPException
+from loguru import logger
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+
+CHAT_HISTORY_SORT = [("timestamp", -1), ("_id", -1)]
+
+
+async def is_attendee(event_id: str, user_id: str, mongo: AsyncDatabase) -> bool:
+    """Whether the user attends the event, only attendees may read its chat."""
+    if not ObjectId.is_valid(event_id) or not ObjectId.is_valid(user_id):
+        return False
+    event = await mongo["events"].find_one(
+        {"_id": ObjectId(event_id), "attendees": {"$in": [ObjectId(user_id)]}},
+        {"_id": 1},
+    )
+    return event is not None
+
+
+async def get_chat_history(
+    event_id: str,
+    mongo: AsyncDatabase,
+    before: str | None = None,
+    limit: int | None = None,
+) -> ChatHistory:
+    """Get a page of chat messages for an event, newest first.
+
+    Args:
+        event_id (str): Event ID
+        mongo (AsyncDatabase): mongo database
+        before (str | None): cursor of the oldest message already loaded
+        limit (int | None): maximum number of messages to return
+
+    Returns:
+        ChatHistory: messages and the cursor for the next, older page
+    """
+    try:
+        limit = min(
+            limit or settings.websockets.chat_history_limit,
+            settings.websockets.chat_history_max_limit,
+        )
+        query: dict = {"event_id": event_id}
+        if before:
+            cursor = decode_cursor(before)
+            # Decoded values go into the filter, anything else could be an operator
+            if (
+                len(cursor) != 2
+                or not isinstance(cursor[0], datetime)
+                or not isinstance(cursor[1], ObjectId)
+            ):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            timestamp, message_id = cursor
+            query["$or"] = [
+                {"timestamp": {"$lt": timestamp}},
+                {"timestamp": timestamp, "_id": {"$lt": message_id}},
+            ]
+
+        # Recent messages still in the write-behind buffer, taken before the
+        # find so that a flush finishing in between can not hide a message
+        pending = chat_buffer.pending(event_id)
+
+        collection: AsyncCollection = mongo["chat"]
+        messages: list[dict] = (
+            await collection.find(query).sort(CHAT_HISTORY_SORT).limit(limit).to_list()
+        )
+
+        if before:
+            pending = [
+                m
+                for m in pending
+                if (m["timestamp"], m["_id"]) < (timestamp, message_id)
+            ]
+        stored = {message["_id"] for message in messages}
+        messages = sorted(
+            messages + [m for m in pending if m["_id"] not in stored],
+            key=lambda message: (message["timestamp"], message["_id"]),
+            reverse=True,
+        )[:limit]
+
+        next_before = None
+        if len(messages) == limit:
+            next_before = encode_cursor(
+                [messages[-1]["timestamp"], messages[-1]["_id"]]
+            )
+        return ChatHistory(
+            messages=[ChatMessage(**message) for message in messages],
+            next_before=next_before,
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+async def get_event_chat(
+    event_id: str,
+    user_id: str,
+    mongo: AsyncDatabase,
+    before: str | None = None,
+    limit: int | None = None,
+) -> ChatHistory:
+    """Get a page of chat history for an attendee of the event.
+
+    Args:
+        event_id (str): Event ID
+        user_id (str): ID of the requesting user
+        mongo (AsyncDatabase): mongo database
+        before (str | None): cursor of the oldest message already loaded
+        limit (int | None): maximum number of messages to return
+
+    Returns:
+        ChatHistory: messages and the cursor for the next, older page
+    """
+    if not await is_attendee(event_id, user_id, mongo):
+        raise HTTPException(status_code=403, detail="User not in event")
+    return await get_chat_history(event_id, mongo, before, limit)
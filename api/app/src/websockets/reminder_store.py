@@ -0,0 +1,219 @@
+"""Redis storage of scheduled event reminders.
+
+Every pending reminder is a member of the single ``reminders:due`` sorted set,
+scored by its due timestamp, so finding due work is one range query no matter
+how many events exist. Members are the JSON notification sent to attendees,
+which includes the reminder's offset so that each due time is its own member.
+``reminders:event:{event_id}`` sets list the members of each event so they can
+be replaced or cancelled together.
+
+Writes run as Lua scripts, pipelined when many events change at once, and
+``claim_due`` pops due reminders atomically so exactly one worker delivers
+each of them. Reminders overdue by more than ``MISSED_REMINDER_GRACE`` are
+dropped by the same script, so missed entries never accumulate. The former
+``event_r:{id}`` keys are replaced once at startup by reminders rebuilt from
+the event documents.
+"""
+
+import json
+import time
+from app.src.events.agenda import agenda_score
+from app.src.events.schemas import Event
+from bson import ObjectId
+from loguru import logger
+from pymongo.asynchronous.database import AsyncDatabase
+from redis.asyncio import Redis
+
+DUE_KEY = "reminders:due"
+# Published when reminders change, so idle schedulers re-check the next due time
+REMINDERS_CHANNEL = "reminders:changed"
+# Reminders older than this (e.g. missed while no worker was running) are
+# dropped instead of being delivered late.
+MISSED_REMINDER_GRACE = 60
+# Events written per pipeline by ``schedule_many_reminders``
+REMINDER_BATCH_SIZE = 1000
+# Per-event sets outlive their last reminder by this many seconds
+EVENT_SET_TTL_MARGIN = 86_400
+
+# KEYS: due set, event set; ARGV: event set ttl, then due time and member pairs
+SCHEDULE_SCRIPT = """
+local previous = redis.call('SMEMBERS', KEYS[2])
+for i = 1, #previous do
+    redis.call('ZREM', KEYS[1], previous[i])
+end
+redis.call('DEL', KEYS[2])
+for i = 2, #ARGV, 2 do
+    redis.call('ZADD', KEYS[1], ARGV[i], ARGV[i + 1])
+    redis.call('SADD', KEYS[2], ARGV[i + 1])
+end
+if #ARGV > 1 then
+    redis.call('EXPIRE', KEYS[2], ARGV[1])
+end
+return (#ARGV - 1) / 2
+"""
+
+# KEYS: due set; ARGV: now, oldest deliverable due time, limit, event set prefix
+# Returns the claimed members and due times, flattened, then the dropped count.
+# Members that are not reminder JSON are dropped rather than failing the claim.
+CLAIM_SCRIPT = """
+local function remove(member)
+    redis.call('ZREM', KEYS[1], member)
+    local ok, reminder = pcall(cjson.decode, member)
+    if not ok or type(reminder) ~= 'table' or reminder['event_id'] == nil then
+        return false
+    end
+    redis.call('SREM', ARGV[4] .. reminder['event_id'], member)
+    return true
+end
+local dropped = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[2])
+local due = redis.call(
+    'ZRANGEBYSCORE', KEYS[1], ARGV[2], ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[3]
+)
+local result = {}
+local count = #dropped
+for i = 1, #dropped do
+    remove(dropped[i])
+end
+for i = 1, #due, 2 do
+    if remove(due[i]) then
+        table.insert(result, due[i])
+        table.insert(result, due[i + 1])
+    else
+        count = count + 1
+    end
+end
+table.insert(result, count)
+return result
+"""
+
+
+def event_reminders_key(event_id: str) -> str:
+    return f"reminders:event:{event_id}"
+
+
+def reminder_members(event: Event) -> dict[str, float]:
+    """Upcoming reminders of an event as sorted set members and due times."""
+    members: dict[str, float] = {}
+    # Compared as timestamps, naive start times are UTC as stored by Mongo
+    start = agenda_score(event.start_time)
+    for rem in event.reminders:
+        due = start - rem.reminder_time * 60
+        if due > time.time():
+            reminder_text: str = json.dumps(
+                {
+                    "event_id": event.event_id,
+                    "event_title": event.title,
+                    "reminder_text": rem.reminder_text,
+                    # Members are unique, reminders with the same text at
+                    # different times must not collapse into one
+                    "reminder_time": rem.reminder_time,
+                    "type": "reminder",
+                }
+            )
+            members[reminder_text] = due
+    return members
+
+
+def schedule_args(event_id: str, members: dict[str, float]) -> tuple:
+    """Arguments of ``SCHEDULE_SCRIPT``, no members cancels the event."""
+    ttl = int(max(members.values(), default=time.time()) - time.time())
+    args: list = [max(ttl, 0) + EVENT_SET_TTL_MARGIN]
+    for member, due in members.items():
+        args.extend((due, member))
+    return (2, DUE_KEY, event_reminders_key(event_id), *args)
+
+
+async def schedule_reminders(event: Event, redis: Redis) -> None:
+    """Replace the stored reminders of an event and notify the schedulers.
+
+    Args:
+        event (Event): event whose reminders should be scheduled
+        redis (Redis): redis client
+    """
+    await schedule_many_reminders([event], redis)
+
+
+async def schedule_many_reminders(events: list[Event], redis: Redis) -> None:
+    """Replace the reminders of many events, one pipeline per batch.
+
+    Args:
+        events (list[Event]): events whose reminders should be scheduled
+        redis (Redis): redis client
+    """
+    try:
+        for start in range(0, len(events), REMINDER_BATCH_SIZE):
+            async with redis.pipeline(transaction=True) as pipe:
+                for event in events[start : start + REMINDER_BATCH_SIZE]:
+                    pipe.eval(
+                        SCHEDULE_SCRIPT,
+                        *schedule_args(event.event_id, reminder_members(event)),
+                    )
+                pipe.publish(REMINDERS_CHANNEL, "")
+                await pipe.execute()
+    except Exception as e:
+        # The events are already saved, failing the request would only make
+        # its retry conflict with them
+        logger.error(f"Reminder scheduling failed for {len(events)} events: {e}")
+
+
+async def cancel_reminders(event_id: str, redis: Redis) -> None:
+    """Drop all pending reminders of an event."""
+    try:
+        await redis.eval(SCHEDULE_SCRIPT, *schedule_args(event_id, {}))
+    except Exception as e:
+        logger.error(f"Reminder cancellation failed for event {event_id}: {e}")
+
+
+async def next_due(redis: Redis) -> float | None:
+    """Due time of the earliest pending reminder."""
+    first = await redis.zrange(DUE_KEY, 0, 0, withscores=True)
+    return first[0][1] if first else None
+
+
+async def claim_due(redis: Redis, limit: int) -> list[tuple[str, float]]:
+    """Remove and return due reminders, each is returned to a single caller.
+
+    Args:
+        redis (Redis): redis client
+        limit (int): maximum number of reminders to claim
+
+    Returns:
+        list[tuple[str, float]]: claimed members and their due times
+    """
+    now = time.time()
+    result = await redis.eval(
+        CLAIM_SCRIPT,
+        1,
+        DUE_KEY,
+        now,
+        now - MISSED_REMINDER_GRACE,
+        limit,
+        event_reminders_key(""),
+    )
+    dropped = result.pop()
+    if dropped:
+        logger.warning(f"Dropped {dropped} missed or invalid reminders")
+    return [(result[i], float(result[i + 1])) for i in range(0, len(result), 2)]
+
+
+async def migrate_legacy_reminders(redis: Redis, mongo: AsyncDatabase) -> None:
+    """Replace the former ``event_r:{id}`` keys with reminders of the events.
+
+    The legacy sorted sets held bare event titles, which the claim script can
+    not decode, so reminders are rebuilt from the event documents and every
+    legacy key, including the sent reminder sets, is deleted.
+    """
+    event_ids: set[str] = set()
+    async for key in redis.scan_iter(match="event_r:*", count=500):
+        event_ids.add(key.split(":")[1])
+        await redis.delete(key)
+    if not event_ids:
+        return
+    ids = [ObjectId(event_id) for event_id in event_ids if ObjectId.is_valid(event_id)]
+    events = [
+        Event(**event) async for event in mongo["events"].find({"_id": {"$in": ids}})
+    ]
+    await schedule_many_reminders(events, redis)
+    logger.info(
+        f"Migrated legacy reminders of {len(event_ids)} events, {len(events)} found"
+    )
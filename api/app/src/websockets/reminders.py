@@ -0,0 +1,170 @@
+import asyncio
+from collections import defaultdict
+import json
+import time
+from app.databases import clients
+from app.metrics import reminder_lag_seconds
+from app.src.websockets.reminder_store import (
+    REMINDERS_CHANNEL,
+    claim_due,
+    migrate_legacy_reminders,
+    next_due,
+)
+from bson import ObjectId
+from fastapi import WebSocket
+from loguru import logger
+from redis.asyncio import Redis
+
+# Claimed reminders are published here, every worker sends them to the
+# attendees connected to it
+DELIVERY_CHANNEL = "reminders:deliver"
+# Reminders claimed per round trip
+CLAIM_BATCH_SIZE = 500
+# Upper bound on sleeping, in case a change notification was missed
+POLL_INTERVAL = 30.0
+
+
+class ReminderScheduler:
+    """Per-process scheduler delivering reminders to connected users.
+
+    Reminders live in the reminder store's due-time sorted set. Each worker
+    sleeps until the earliest one is due (or a change is published), then
+    claims due reminders atomically, so exactly one worker handles each of
+    them. The claiming worker looks up the attendees and publishes the
+    reminder on ``DELIVERY_CHANNEL``, and every worker sends it to the
+    attendees connected to it.
+    """
+
+    def __init__(self) -> None:
+        self.connections: dict[str, set[WebSocket]] = defaultdict(set)
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def connect(self, user_id: str, websocket: WebSocket) -> None:
+        self.connections[user_id].add(websocket)
+
+    def disconnect(self, user_id: str, websocket: WebSocket) -> None:
+        self.connections[user_id].discard(websocket)
+        if not self.connections[user_id]:
+            del self.connections[user_id]
+
+    async def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._run()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _listen(self) -> None:
+        """Wake up on reminder changes and deliver reminders claimed anywhere."""
+        while True:
+            pubsub = clients.get_redis().pubsub()
+            try:
+                await pubsub.subscribe(REMINDERS_CHANNEL, DELIVERY_CHANNEL)
+                # Changes may have been missed while not subscribed
+                self._wakeup.set()
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=5.0
+                    )
+                    if not message:
+                        continue
+                    if message["channel"] == DELIVERY_CHANNEL:
+                        await self._send(json.loads(message["data"]))
+                    else:
+                        self._wakeup.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Reminder listener error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def _run(self) -> None:
+        try:
+            await migrate_legacy_reminders(clients.get_redis(), clients.get_db())
+        except Exception as e:
+            logger.error(f"Reminder migration failed: {e}")
+        while True:
+            self._wakeup.clear()
+            timeout = POLL_INTERVAL
+            try:
+                redis = clients.get_redis()
+                claimed = await claim_due(redis, CLAIM_BATCH_SIZE)
+                claimed_at = time.time()
+                for _, due in claimed:
+                    reminder_lag_seconds.observe(max(claimed_at - due, 0))
+                if claimed:
+                    await self._publish(redis, claimed)
+                if len(claimed) == CLAIM_BATCH_SIZE:
+                    continue
+                due = await next_due(redis)
+                if due is not None:
+                    timeout = min(max(due - time.time(), 0), POLL_INTERVAL)
+            except Exception as e:
+                logger.error(f"Error firing reminders: {e}")
+                timeout = 1.0
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+
+    async def _publish(self, redis: Redis, claimed: list[tuple[str, float]]) -> None:
+        reminders = [
+            (member, json.loads(member)["event_id"]) for member in dict(claimed)
+        ]
+        events = await (
+            clients.get_db()["events"]
+            .find(
+                {"_id": {"$in": [ObjectId(event_id) for _, event_id in reminders]}},
+                {"attendees": 1},
+            )
+            .to_list()
+        )
+        attendees = {
+            str(event["_id"]): [str(user_id) for user_id in event.get("attendees", [])]
+            for event in events
+        }
+        async with redis.pipeline(transaction=False) as pipe:
+            for member, event_id in reminders:
+                if attendees.get(event_id):
+                    pipe.publish(
+                        DELIVERY_CHANNEL,
+                        json.dumps(
+                            {"user_ids": attendees[event_id], "reminder": member}
+                        ),
+                    )
+            await pipe.execute()
+
+    async def _send(self, delivery: dict) -> None:
+        sockets = [
+            websocket
+            for user_id in delivery["user_ids"]
+            for websocket in self.connections.get(user_id, ())
+        ]
+        await asyncio.gather(
+            *(send_reminder_notification(ws, delivery["reminder"]) for ws in sockets),
+            return_exceptions=True,
+        )
+
+
+async def send_reminder_notification(websocket: WebSocket, reminder_text: str):
+    """Sends a reminder notification over the WebSocket."""
+    try:
+        await websocket.send_text(reminder_text)
+    except RuntimeError as e:
+        if "WebSocket is not connected" in str(e):
+            logger.info("WebSocket disconnected, stopping reminder sending.")
+            return False  # Indicate disconnection
+        else:
+            raise  # Re-raise other RuntimeErrors
+    return True
+
+
+reminder_scheduler = ReminderScheduler()
@@ -1,141 +1,53 @@
-import asyncio
-from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 from typing import Annotated
 from app.databases import get_mongo_client, get_redis_client
+from app.src.users.controllers import get_users_by_ids
+from app.src.websockets.broadcast import chat_broadcast
+from app.src.websockets.chat_buffer import chat_buffer
+from app.src.websockets.connections import QueuedConnection, stats
+from app.src.websockets.controllers import get_chat_history, is_attendee
+from app.src.websockets.reminders import reminder_scheduler
 from bson import ObjectId
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
 from loguru import logger
-from pymongo import MongoClient
-from redis import Redis
 
 router = APIRouter(prefix="/ws")
 
 
-async def send_reminder_notification(websocket: WebSocket, reminder_text: str):
-    """Sends a reminder notification over the WebSocket."""
-    try:
-        await websocket.send_text(reminder_text)
-    except RuntimeError as e:
-        if "WebSocket is not connected" in str(e):
-            logger.info("WebSocket disconnected, stopping reminder sending.")
-            return False  # Indicate disconnection
-        else:
-            raise  # Re-raise other RuntimeErrors
-    return True
-
-
-async def monitor_reminders(
-    websocket: WebSocket, user_id: str, redis: Redis, mongo: MongoClient
-):
-    """Monitors reminders for a user and sends notifications via WebSocket."""
-    try:
-        while True:  # Keep monitoring until WebSocket disconnects
-            await websocket.send_text("test")
-            events = mongo["events"].find({"attendees": {"$in": [ObjectId(user_id)]}})
-            for event in events:
-                event_id = str(event["_id"])
-                reminders_key = f"event_r:{event_id}:reminders"
-                sent_reminders_key = f"event_r:{event_id}:sent_reminders"
-
-                # Get reminders from event data
-                event_reminders = event.get("reminders", [])
-                # Calculate upcoming reminders based on event start time
-                upcoming_reminders = []
-                event_start_time = event.get("start_time")
-                if event_start_time:
-                    for rem in event_reminders:
-                        reminder_time = event_start_time - timedelta(
-                            minutes=rem["reminder_time"]
-                        )
-                        if reminder_time.replace(
-                            second=0, microsecond=0
-                        ) >= datetime.now().replace(second=0, microsecond=0):
-                            # Reminder is upcoming and hasn't been sent yet
-                            reminder_text: str = json.dumps(
-                                {
-                                    "event_id": event_id,
-                                    "event_title": event["title"],
-                                    "reminder_text": rem["reminder_text"],
-                                    "type": "reminder",
-                                }
-                            )
-                            upcoming_reminders.append(
-                                (
-                                    reminder_text.encode("utf-8"),
-                                    reminder_time.timestamp(),
-                                )
-                            )
-
-                # Sort reminders by timestamp (ascending)
-                upcoming_reminders.sort(key=lambda x: x[1])
-
-                for reminder, _rem_timestamp in upcoming_reminders:
-                    # Check if the reminder has already been sent
-                    if redis.zscore(sent_reminders_key, reminder) is None:
-                        if await send_reminder_notification(
-                            websocket, reminder.decode("utf-8")
-                        ):
-                            redis.zrem(reminders_key, reminder)  # Remove from reminders
-                            redis.zadd(sent_reminders_key, {reminder: _rem_timestamp})
-                        else:
-                            return  # Exit the loop if WebSocket is disconnected
-
-            await asyncio.sleep(30)
-    except Exception as e:
-        logger.info(f"Error in reminder monitoring: {e}")
-    finally:
-        await websocket.close()  # Close connection only once, after loop exits
-
-        logger.info(f"Reminder monitoring stopped for user {user_id}")
-
-
 @router.websocket("/{user_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
     user_id: str,
-    redis: Annotated[get_redis_client, Depends()],
     mongo: Annotated[get_mongo_client, Depends()],
+    redis: Annotated[get_redis_client, Depends()],
 ) -> None:
-    is_closed = False  # Flag to track WebSocket closure
-
-    try:
-        if mongo["users"].find_one({"_id": ObjectId(user_id)}) is None:
-            await websocket.close(code=1000, reason="User not found")
-            is_closed = True
-            return
-
-        await websocket.accept()
-        logger.info(f"WebSocket connection established for user {user_id}")
-
-        events = mongo["events"].find({"attendees": {"$in": [ObjectId(user_id)]}})
-        if not events:
-            await websocket.send_text(
-                json.dumps({"type": "message", "content": "Nemáte žádné události"})
-            )
-            await websocket.close()
-            is_closed = True
-            return
-
-        await monitor_reminders(websocket, user_id, redis, mongo)
+    """
+    Reminder notifications for a user, delivered by the reminder scheduler.
+    """
+    if not await get_users_by_ids([user_id], mongo, redis):
+        await websocket.close(code=1000, reason="User not found")
+        return
 
-        # Keep the connection alive to receive data
-        await websocket.receive()
+    await websocket.accept()
+    logger.info(f"WebSocket connection established for user {user_id}")
+    reminder_scheduler.connect(user_id, websocket)
 
+    try:
+        # Keep the connection open until the client goes away
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket connection closed for user {user_id}")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
-
     finally:
-        if not is_closed:
-            logger.info(f"Closing WebSocket connection for user {user_id}")
-            await websocket.close()
-            is_closed = True
+        reminder_scheduler.disconnect(user_id, websocket)
 
 
-active_connections = defaultdict(
-    set
-)  # A dictionary to store active WebSocket connections by event_id
+@router.get("/stats", summary="Chat send queue and write buffer statistics")
+async def endp_get_connection_stats() -> dict[str, int | float]:
+    return {**stats.snapshot(), **chat_buffer.stats()}
 
 
 @router.websocket("/chat/{event_id}")
@@ -143,13 +55,14 @@ async def chat_websocket_endpoint(
     websocket: WebSocket,
     event_id: str,
     mongo: Annotated[get_mongo_client, Depends()],
+    redis: Annotated[get_redis_client, Depends()],
 ) -> None:
     """
     WebSocket chat room for events. User details are sent in the first message.
     """
     if (
         not ObjectId.is_valid(event_id)
-        or mongo["events"].find_one({"_id": ObjectId(event_id)}) is None
+        or await mongo["events"].find_one({"_id": ObjectId(event_id)}) is None
     ):
         await websocket.close(code=1000, reason="Event not found")
         return
@@ -165,57 +78,78 @@ async def chat_websocket_endpoint(
         await websocket.close(code=1003, reason="Invalid user details")
         return
 
-    if mongo["users"].find_one({"_id": ObjectId(user_id)}) is None:
+    if not await get_users_by_ids([user_id], mongo, redis):
         await websocket.close(code=1000, reason="User not found")
         return
 
-    if (
-        mongo["events"].find_one(
-            {"_id": ObjectId(event_id), "attendees": {"$in": [ObjectId(user_id)]}}
-        )
-        is None
-    ):
+    if not await is_attendee(event_id, user_id, mongo):
         await websocket.close(code=1000, reason="User not in event")
         return
 
-    collection = mongo["chat"]
+    # Send the most recent page of chat history, older pages are loaded on demand
+    # with the "next_before" cursor, the reply to "load_older" has the same shape
+    history = await get_chat_history(event_id=event_id, mongo=mongo)
+    page = history.model_dump(mode="json", by_alias=True)
+    page["type"] = "history"
+    await websocket.send_text(json.dumps(page))
 
-    # Load and send chat history
-    load_history = collection.find({"event_id": event_id}).sort("timestamp", -1)
-    load_history = list(load_history)
-    for message in load_history:
-        message["type"] = "load"
-        message["_id"] = str(message["_id"])
-        message["timestamp"] = message["timestamp"].isoformat()
-
-    await websocket.send_text(json.dumps(load_history))
-
-    # Add the current WebSocket connection to the active connections
-    active_connections[event_id].add(websocket)
+    # Subscribe the current WebSocket connection to the event's chat channel
+    connection = QueuedConnection(websocket)
+    connection.start()
+    await chat_broadcast.subscribe(event_id, connection)
 
     try:
         while True:
             data = await websocket.receive_text()
             data_object = json.loads(data)
             if data_object["type"] == "message":
+                # Mongo stores milliseconds, the buffered copy must sort and
+                # build cursors the same way
+                now = datetime.utcnow()
                 message = {
+                    "_id": ObjectId(),
                     "event_id": event_id,
                     "user_id": user_id,
                     "name": user_name,
                     "message": data_object["message"],
-                    "timestamp": datetime.utcnow(),
+                    "timestamp": now.replace(
+                        microsecond=now.microsecond // 1000 * 1000
+                    ),
                 }
-                collection.insert_one(message)
-                message["type"] = "message"
-                message["_id"] = str(message["_id"])
-                message["timestamp"] = message["timestamp"].isoformat()
+                # Persisted in batches by the write-behind buffer
+                chat_buffer.add(message)
 
                 # Broadcast the message to all connections for this event_id
-                for conn in active_connections[event_id]:
-                    await conn.send_text(json.dumps(message))
+                await chat_broadcast.publish(
+                    event_id,
+                    json.dumps(
+                        {
+                            **message,
+                            "_id": str(message["_id"]),
+                            "timestamp": message["timestamp"].isoformat(),
+                            "type": "message",
+                        }
+                    ),
+                )
+            elif data_object["type"] == "load_older":
+                try:
+                    history = await get_chat_history(
+                        event_id=event_id,
+                        mongo=mongo,
+                        before=data_object.get("before"),
+                        limit=data_object.get("limit"),
+                    )
+                except HTTPException as e:
+                    await connection.send_text(
+                        json.dumps({"type": "error", "detail": e.detail})
+                    )
+                    continue
+                page = history.model_dump(mode="json", by_alias=True)
+                page["type"] = "history"
+                await connection.send_text(json.dumps(page))
 
     except WebSocketDisconnect:
-        # Remove the disconnected WebSocket from active connections
-        active_connections[event_id].remove(websocket)
-        if not active_connections[event_id]:
-            del active_connections[event_id]  # Clean up empty event_id entry
+        pass
+    finally:
+        await chat_broadcast.unsubscribe(event_id, connection)
+        await connection.close()
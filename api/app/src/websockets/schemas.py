@@ -0,0 +1,24 @@
+from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
+
+
+class ChatMessage(BaseModel):
+    id: str = Field(alias="_id")
+    event_id: str
+    user_id: str
+    name: str
+    message: str
+    timestamp: datetime
+    type: str = "load"
+
+    @field_validator("id", mode="before")
+    @classmethod
+    def transform_id(cls, value) -> str:
+        if not isinstance(value, str):
+            return str(value)
+        return value
+
+
+class ChatHistory(BaseModel):
+    messages: list[ChatMessage]
+    next_before: str | None = None
@@ -0,0 +1,106 @@
+from collections.abc import AsyncIterator
+from datetime import datetime
+import json
+from typing import Literal
+from bson import ObjectId
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from loguru import logger
+from pymongo.asynchronous.cursor import AsyncCursor
+from app.config import settings
+
+StreamFormat = Literal["ndjson", "json"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def join_chunk(chunk: list[str], stream_format: StreamFormat, continued: bool) -> str:
+    if stream_format == "ndjson":
+        return "\n".join(chunk) + "\n"
+    # Array elements after the first chunk need a leading separator
+    return ("," if continued else "") + ",".join(chunk)
+
+
+async def iter_documents(
+    cursor: AsyncCursor, stream_format: StreamFormat
+) -> AsyncIterator[str]:
+    """Serialize documents as they arrive from Mongo, one chunk per batch.
+
+    Args:
+        cursor (AsyncCursor): cursor over the documents to send
+        stream_format (StreamFormat): "ndjson" for one document per line,
+            "json" for a single JSON array sent in chunks
+
+    Yields:
+        str: serialized chunk
+    """
+    batch_size = settings.app.stream_batch_size
+    chunk: list[str] = []
+    continued = False
+    if stream_format == "json":
+        yield "["
+    try:
+        async for document in cursor.batch_size(batch_size):
+            chunk.append(json.dumps(document, default=json_default))
+            if len(chunk) >= batch_size:
+                yield join_chunk(chunk, stream_format, continued)
+                continued = True
+                chunk = []
+        if chunk:
+            yield join_chunk(chunk, stream_format, continued)
+    except Exception as e:
+        # Headers are already sent, the client sees a truncated body
+        logger.error(f"Error while streaming documents: {e}")
+        raise
+    if stream_format == "json":
+        yield "]"
+
+
+def stream_documents(
+    cursor: AsyncCursor, stream_format: StreamFormat
+) -> StreamingResponse:
+    return StreamingResponse(
+        iter_documents(cursor, stream_format), media_type=MEDIA_TYPES[stream_format]
+    )
+
+
+async def read_documents(request: Request) -> list:
+    """Read an uploaded JSON array, or NDJSON when sent as application/x-ndjson.
+
+    Args:
+        request (Request): request with the upload as its body
+
+    Returns:
+        list: decoded documents
+    """
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith(MEDIA_TYPES["ndjson"]):
+        documents = []
+        for number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                documents.append(json.loads(line))
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=400, detail=f"Invalid JSON on line {number}"
+                ) from e
+        return documents
+    try:
+        documents = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid JSON") from e
+    if not isinstance(documents, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array")
+    return documents
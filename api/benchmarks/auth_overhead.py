@@ -0,0 +1,108 @@
+"""Measure the cost of authentication per request.
+
+Run from the ``api`` directory with the usual environment::
+
+    python -m benchmarks.auth_overhead --requests 20000 --tokens 1000
+
+Requests go through ``AuthMiddleware`` in front of an app that returns at
+once, so the timings are the middleware alone. The scenarios are:
+
+* ``public``: a public path, no token is read
+* ``cached``: the usual request, token cache hit and revocation filter miss
+* ``decode``: every token is new to the process, the JWT is verified
+* ``redis``: the revocation filter can not answer, Redis is asked, as for a
+  revoked token or a false positive
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from app.databases import clients
+from app.src.auth.middleware import AuthMiddleware, token_cache
+from app.src.auth.revocation import revocation_list
+from app.src.auth.utils import generate_jwt_token
+from benchmarks.common import percentile
+from starlette.types import Receive, Scope, Send
+
+
+async def endpoint(scope: Scope, receive: Receive, send: Send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def http_scope(path: str, token: str | None) -> Scope:
+    headers = [] if token is None else [(b"authorization", f"Bearer {token}".encode())]
+    return {"type": "http", "method": "GET", "path": path, "headers": headers}
+
+
+async def receive() -> dict:
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message: dict) -> None:
+    if message["type"] == "http.response.start" and message["status"] != 200:
+        raise RuntimeError(f"Unexpected status {message['status']}")
+
+
+def new_tokens(count: int) -> list[str]:
+    return [
+        generate_jwt_token(
+            f"{i:024x}", f"bench{i}@example.com", f"bench{i}", "Bench", "Mark"
+        )
+        for i in range(count)
+    ]
+
+
+async def measure(
+    middleware: AuthMiddleware, path: str, tokens: list[str | None], requests: int
+) -> list[float]:
+    timings: list[float] = []
+    for index in range(requests):
+        scope = http_scope(path, tokens[index % len(tokens)])
+        started = time.perf_counter()
+        await middleware(scope, receive, send)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return timings
+
+
+async def main(requests: int, tokens: int) -> None:
+    clients.connect()
+    redis = clients.get_redis()
+    middleware = AuthMiddleware(endpoint, public_paths=["/public"])
+    try:
+        await revocation_list.rebuild(redis)
+        known = new_tokens(tokens)
+        results = {
+            "public": await measure(middleware, "/public", [None], requests),
+        }
+        await measure(middleware, "/private", known, tokens)
+        results["cached"] = await measure(middleware, "/private", known, requests)
+        # Fresh tokens, each seen once
+        results["decode"] = await measure(
+            middleware, "/private", new_tokens(requests), requests
+        )
+        # Every token ID looks revoked to the filter, Redis has the answer
+        revocation_list._ready = False
+        results["redis"] = await measure(middleware, "/private", known, requests)
+        revocation_list._ready = True
+
+        print(f"{'scenario':>8} {'median us':>10} {'p95 us':>8} {'p99 us':>8}")
+        for name, timings in results.items():
+            print(
+                f"{name:>8} {statistics.median(timings):>10.1f} "
+                f"{percentile(timings, 0.95):>8.1f} "
+                f"{percentile(timings, 0.99):>8.1f}"
+            )
+        print(revocation_list.stats())
+        print({"token_cache_hits": token_cache.hits, "misses": token_cache.misses})
+    finally:
+        await clients.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--tokens", type=int, default=1_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.tokens))
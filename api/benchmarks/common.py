@@ -0,0 +1,6 @@
+"""Helpers shared by the benchmark scripts."""
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
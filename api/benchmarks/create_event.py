@@ -0,0 +1,88 @@
+"""Measure ``create_event`` latency against the number of attendees.
+
+Run from the ``api`` directory with the usual environment::
+
+    python -m benchmarks.create_event --attendees 1 10 100 500 --repeat 20
+
+Users and events are written to a separate database (``benchmark`` by
+default) and removed afterwards. The ``sequential`` column times the former
+validation, one ``find_one`` per attendee, for comparison.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+import statistics
+import time
+from bson import ObjectId
+from app.databases import clients
+from app.indexes import ensure_indexes
+from app.src.events.controllers import create_event, delete_event
+from app.src.events.schemas import EventCreate
+from benchmarks.common import percentile
+
+
+async def sequential_validation(user_ids: list[ObjectId], mongo) -> None:
+    for user_id in user_ids:
+        await mongo["users"].find_one({"_id": user_id})
+
+
+async def main(attendee_counts: list[int], repeat: int, database: str) -> None:
+    clients.connect()
+    mongo = clients.get_mongo()[database]
+    redis = clients.get_redis()
+    start_time = datetime.now() + timedelta(days=365)
+    try:
+        await ensure_indexes(mongo)
+        print(f"{'attendees':>9} {'median ms':>10} {'p95 ms':>8} {'sequential':>10}")
+        for count in attendee_counts:
+            result = await mongo["users"].insert_many(
+                [
+                    {
+                        "username": f"benchmark{i}",
+                        "first_name": "Bench",
+                        "last_name": "Mark",
+                        "email": f"benchmark{i}@example.com",
+                    }
+                    for i in range(count)
+                ]
+            )
+            user_ids = [str(user_id) for user_id in result.inserted_ids]
+
+            timings = []
+            for run in range(repeat):
+                data = EventCreate(
+                    title=f"benchmark {count} {run} {ObjectId()}",
+                    start_time=start_time,
+                    end_time=start_time + timedelta(hours=1),
+                    description="benchmark",
+                    creator=user_ids[0],
+                    attendees=user_ids,
+                )
+                started = time.perf_counter()
+                event = await create_event(data, mongo, redis)
+                timings.append((time.perf_counter() - started) * 1000)
+                await delete_event(event.event_id, mongo, redis)
+
+            started = time.perf_counter()
+            await sequential_validation(result.inserted_ids, mongo)
+            sequential = (time.perf_counter() - started) * 1000
+
+            await mongo["users"].delete_many({"_id": {"$in": result.inserted_ids}})
+            print(
+                f"{count:>9} {statistics.median(timings):>10.2f} "
+                f"{percentile(timings, 0.95):>8.2f} {sequential:>10.2f}"
+            )
+    finally:
+        await clients.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--attendees", type=int, nargs="+", default=[1, 10, 100, 500, 1000]
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database", default="benchmark")
+    args = parser.parse_args()
+    asyncio.run(main(args.attendees, args.repeat, args.database))
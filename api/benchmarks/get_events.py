@@ -0,0 +1,140 @@
+"""Compare the planned ``get_events`` time filters with the former ``$or``.
+
+Run from the ``api`` directory with the usual environment::
+
+    python -m benchmarks.get_events --events 1000000 --repeat 20
+
+Events spread over two years around now are written to a separate database
+(``benchmark`` by default) and dropped afterwards unless ``--keep`` is given,
+so later runs can reuse them. Each filter combination is timed for a page of
+``--limit`` events sorted by ``start_time``, together with the number of
+documents the query examined.
+"""
+
+import argparse
+import asyncio
+from datetime import UTC, datetime, timedelta
+import random
+import statistics
+import time
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.asynchronous.database import AsyncDatabase
+from app.databases import clients
+from app.indexes import ensure_indexes
+from app.src.events.controllers import build_events_query
+from benchmarks.common import percentile
+
+BATCH_SIZE = 10_000
+
+FILTERS = {
+    "pass": (True, False, False),
+    "upcoming": (False, True, False),
+    "current": (False, False, True),
+    "pass+current": (True, False, True),
+    "upcoming+current": (False, True, True),
+    "pass+upcoming": (True, True, False),
+    "all": (True, True, True),
+}
+
+
+def legacy_events_query(
+    include_pass_event: bool, include_upcoming_event: bool, include_current_event: bool
+) -> dict:
+    """Filter built before the planner, one ``$or`` branch per flag."""
+    time_conditions = []
+    if include_pass_event:
+        time_conditions.append({"end_time": {"$lt": datetime.now()}})
+    if include_upcoming_event:
+        time_conditions.append({"start_time": {"$gt": datetime.now()}})
+    if include_current_event:
+        time_conditions.append(
+            {
+                "$and": [
+                    {"start_time": {"$lt": datetime.now()}},
+                    {"end_time": {"$gt": datetime.now()}},
+                ]
+            }
+        )
+    return {"$or": time_conditions}
+
+
+async def seed(mongo: AsyncDatabase, count: int) -> None:
+    existing = await mongo["events"].estimated_document_count()
+    if existing >= count:
+        return
+    creator = ObjectId()
+    # Stored times are naive UTC
+    now = datetime.now(UTC).replace(tzinfo=None)
+    for start in range(existing, count, BATCH_SIZE):
+        documents = []
+        for i in range(start, min(start + BATCH_SIZE, count)):
+            start_time = now + timedelta(minutes=random.randint(-525_600, 525_600))
+            documents.append(
+                {
+                    "title": f"benchmark {i}",
+                    "start_time": start_time,
+                    "end_time": start_time
+                    + timedelta(minutes=random.choice((30, 60, 120, 1440))),
+                    "description": "benchmark",
+                    "creator": creator,
+                    "attendees": [creator],
+                    "reminders": [],
+                }
+            )
+        await mongo["events"].insert_many(documents, ordered=False)
+
+
+async def measure(
+    mongo: AsyncDatabase, query: dict, limit: int, repeat: int
+) -> tuple[float, float, int]:
+    sort = [("start_time", ASCENDING), ("_id", ASCENDING)]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await mongo["events"].find(query).sort(sort).limit(limit).to_list()
+        timings.append((time.perf_counter() - started) * 1000)
+    explain = await mongo["events"].find(query).sort(sort).limit(limit).explain()
+    examined = explain["executionStats"]["totalDocsExamined"]
+    return statistics.median(timings), percentile(timings, 0.95), examined
+
+
+async def main(count: int, limit: int, repeat: int, database: str, keep: bool) -> None:
+    clients.connect()
+    mongo = clients.get_mongo()[database]
+    try:
+        await seed(mongo, count)
+        await ensure_indexes(mongo)
+        print(
+            f"{'filter':>16} {'query':>8} {'median ms':>10} {'p95 ms':>8} "
+            f"{'examined':>9}"
+        )
+        for name, (past, upcoming, current) in FILTERS.items():
+            queries = {
+                "legacy": legacy_events_query(past, upcoming, current),
+                "planned": build_events_query(
+                    include_pass_event=past,
+                    include_upcoming_event=upcoming,
+                    include_current_event=current,
+                ),
+            }
+            for label, query in queries.items():
+                median, p95, examined = await measure(mongo, query, limit, repeat)
+                print(
+                    f"{name:>16} {label:>8} {median:>10.2f} {p95:>8.2f} {examined:>9}"
+                )
+    finally:
+        if not keep:
+            await mongo["events"].drop()
+        await clients.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database", default="benchmark")
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.limit, args.repeat, args.database, args.keep))
@@ -0,0 +1,121 @@
+"""Measure login throughput and event loop responsiveness during a burst.
+
+Run from the ``api`` directory with the usual environment::
+
+    python -m benchmarks.login --users 50 --logins 500 --concurrency 100
+
+Users are written to a separate database (``benchmark`` by default) and
+removed afterwards. Logins go through ``get_access_token``, which also
+stores a refresh token in Redis, so Redis must be reachable. Its bcrypt
+calls run in the credential service's process pool; ``--threadpool`` runs
+them on the request threadpool instead, as before, for comparison. The loop
+lag column is the worst delay of a 10 ms timer while the burst runs, i.e.
+how long any other request would have waited.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from app.databases import clients
+from app.src.auth.controllers import get_access_token, issue_tokens
+from app.src.auth.credentials import credential_service
+from app.src.auth.utils import verify_password
+from benchmarks.common import percentile
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordRequestForm
+from pymongo.asynchronous.database import AsyncDatabase
+from redis.asyncio import Redis
+
+PASSWORD = "benchmark-password"
+
+
+async def threadpool_login(
+    data: OAuth2PasswordRequestForm, mongo: AsyncDatabase, redis: Redis
+):
+    """Login with bcrypt on the threadpool, as before the credential service."""
+    user = await mongo["users"].find_one({"username": data.username})
+    if not await run_in_threadpool(verify_password, data.password, user["password"]):
+        raise HTTPException(status_code=401, detail="Invalid password")
+    return await issue_tokens(user, redis)
+
+
+async def measure_lag(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+
+
+async def main(
+    users: int, logins: int, concurrency: int, database: str, threadpool: bool
+) -> None:
+    clients.connect()
+    mongo = clients.get_mongo()[database]
+    redis = clients.get_redis()
+    await credential_service.start()
+    login = threadpool_login if threadpool else get_access_token
+    try:
+        hashed = await credential_service.hash(PASSWORD)
+        result = await mongo["users"].insert_many(
+            [
+                {
+                    "username": f"benchmark{i}",
+                    "first_name": "Bench",
+                    "last_name": "Mark",
+                    "email": f"benchmark{i}@example.com",
+                    "password": hashed,
+                }
+                for i in range(users)
+            ]
+        )
+
+        slots = asyncio.Semaphore(concurrency)
+        timings: list[float] = []
+
+        async def timed_login(index: int) -> None:
+            form = OAuth2PasswordRequestForm(
+                username=f"benchmark{index % users}", password=PASSWORD
+            )
+            async with slots:
+                started = time.perf_counter()
+                await login(data=form, mongo=mongo, redis=redis)
+                timings.append((time.perf_counter() - started) * 1000)
+
+        stop = asyncio.Event()
+        lags: list[float] = []
+        lag_task = asyncio.create_task(measure_lag(stop, lags))
+        started = time.perf_counter()
+        await asyncio.gather(*(timed_login(index) for index in range(logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await lag_task
+
+        print(
+            f"{'mode':>10} {'logins/s':>9} {'median ms':>10} {'p95 ms':>8} "
+            f"{'loop lag ms':>11} {'max queue ms':>12}"
+        )
+        print(
+            f"{'threads' if threadpool else 'processes':>10} "
+            f"{logins / elapsed:>9.1f} {statistics.median(timings):>10.1f} "
+            f"{percentile(timings, 0.95):>8.1f} {max(lags) * 1000:>11.1f} "
+            f"{credential_service.max_queue_seconds * 1000:>12.1f}"
+        )
+        await mongo["users"].delete_many({"_id": {"$in": result.inserted_ids}})
+    finally:
+        await credential_service.stop()
+        await clients.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--database", default="benchmark")
+    parser.add_argument("--threadpool", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(
+        main(args.users, args.logins, args.concurrency, args.database, args.threadpool)
+    )
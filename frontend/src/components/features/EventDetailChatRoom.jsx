@@ -40,10 +40,10 @@ export const EventDetailChatRoom = ({ event, eventId }) => {
     ws.onmessage = (event) => {
       const message = JSON.parse(event.data);
       // Check if the message is a history message or a new message
-      if (Array.isArray(message)) {
+      if (message.type === "history") {
         // If it's a history message, set the initial messages
         console.log("Loading history messages...");
-        setMessages(message);
+        setMessages(message.messages);
       } else {
         // If it's a new message, append it to the messages
         setMessages((prev) => [...prev, message]);